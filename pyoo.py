@@ -7,12 +7,24 @@ Copyright (c) 2016 Seznam.cz, a.s.
 
 from __future__ import division
 
+import array
+import contextlib
 import datetime
 import functools
+import io
 import itertools
+import math
 import numbers
 import os
+import random
+import shutil
+import signal
+import socket
+import subprocess
 import sys
+import tempfile
+import threading
+import time
 
 import uno
 
@@ -22,35 +34,22 @@ FILTER_PDF_EXPORT = 'writer_pdf_Export'
 FILTER_EXCEL_97 = 'MS Excel 97'
 FILTER_EXCEL_2007 = 'Calc MS Excel 2007 XML'
 
-# Number format choices
-FORMAT_TEXT = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.TEXT')
-FORMAT_INT = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.NUMBER_INT')
-FORMAT_FLOAT = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.NUMBER_DEC2')
-FORMAT_INT_SEP = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.NUMBER_1000INT')
-FORMAT_FLOAT_SEP = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.NUMBER_1000DEC2')
-FORMAT_PERCENT_INT = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.PERCENT_INT')
-FORMAT_PERCENT_FLOAT = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.PERCENT_DEC2')
-FORMAT_DATE = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.DATE_SYSTEM_SHORT')
-FORMAT_TIME = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.TIME_HHMM')
-FORMAT_DATETIME = uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.DATETIME_SYSTEM_SHORT_HHMM')
-
-# Font weight choices
-FONT_WEIGHT_DONTKNOW = uno.getConstantByName('com.sun.star.awt.FontWeight.DONTKNOW')
-FONT_WEIGHT_THIN = uno.getConstantByName('com.sun.star.awt.FontWeight.THIN')
-FONT_WEIGHT_ULTRALIGHT = uno.getConstantByName('com.sun.star.awt.FontWeight.ULTRALIGHT')
-FONT_WEIGHT_LIGHT = uno.getConstantByName('com.sun.star.awt.FontWeight.LIGHT')
-FONT_WEIGHT_SEMILIGHT = uno.getConstantByName('com.sun.star.awt.FontWeight.SEMILIGHT')
-FONT_WEIGHT_NORMAL = uno.getConstantByName('com.sun.star.awt.FontWeight.NORMAL')
-FONT_WEIGHT_SEMIBOLD = uno.getConstantByName('com.sun.star.awt.FontWeight.SEMIBOLD')
-FONT_WEIGHT_BOLD = uno.getConstantByName('com.sun.star.awt.FontWeight.BOLD')
-FONT_WEIGHT_ULTRABOLD = uno.getConstantByName('com.sun.star.awt.FontWeight.ULTRABOLD')
-FONT_WEIGHT_BLACK = uno.getConstantByName('com.sun.star.awt.FontWeight.BLACK')
-
-# Text underline choices (only first three are present here)
-UNDERLINE_NONE = uno.getConstantByName('com.sun.star.awt.FontUnderline.NONE')
-UNDERLINE_SINGLE = uno.getConstantByName('com.sun.star.awt.FontUnderline.SINGLE')
-UNDERLINE_DOUBLE = uno.getConstantByName('com.sun.star.awt.FontUnderline.DOUBLE')
+# File extensions of documents saved by the filters above.
+_FILTER_EXTENSIONS = {
+    FILTER_PDF_EXPORT: '.pdf',
+    FILTER_EXCEL_97: '.xls',
+    FILTER_EXCEL_2007: '.xlsx',
+}
 
+# Options for fast loading of documents which are processed without
+# user interaction (see Desktop.open_spreadsheet). Read-only documents
+# do not create lock files.
+LOAD_OPTIONS_BATCH = {
+    'hidden': True,
+    'read_only': True,
+    'macros': False,
+    'update_links': False,
+}
 
 # Text alignment choices
 TEXT_ALIGN_STANDARD = 'STANDARD'
@@ -60,21 +59,180 @@ TEXT_ALIGN_RIGHT = 'RIGHT'
 TEXT_ALIGN_BLOCK = 'BLOCK'
 TEXT_ALIGN_REPEAT = 'REPEAT'
 
-# Axis choices
-AXIS_PRIMARY = uno.getConstantByName('com.sun.star.chart.ChartAxisAssign.PRIMARY_Y')
-AXIS_SECONDARY = uno.getConstantByName('com.sun.star.chart.ChartAxisAssign.SECONDARY_Y')
+# Series fill choices (see CellRange.fill_series)
+FILL_MODE_SIMPLE = 'SIMPLE'
+FILL_MODE_LINEAR = 'LINEAR'
+FILL_MODE_GROWTH = 'GROWTH'
+FILL_MODE_DATE = 'DATE'
+FILL_MODE_AUTO = 'AUTO'
+
+# Date fill choices used with FILL_MODE_DATE
+FILL_DATE_DAY = 'FILL_DATE_DAY'
+FILL_DATE_WEEKDAY = 'FILL_DATE_WEEKDAY'
+FILL_DATE_MONTH = 'FILL_DATE_MONTH'
+FILL_DATE_YEAR = 'FILL_DATE_YEAR'
+
+# Functions accepted by CellRange.aggregate mapped to names
+# of com.sun.star.sheet.GeneralFunction values.
+_AGGREGATE_FUNCTIONS = {
+    'sum': 'SUM',
+    'count': 'COUNT', # All non-empty cells.
+    'count_numbers': 'COUNTNUMS',
+    'average': 'AVERAGE',
+    'max': 'MAX',
+    'min': 'MIN',
+    'product': 'PRODUCT',
+    'stdev': 'STDEV',
+    'stdevp': 'STDEVP',
+    'var': 'VAR',
+    'varp': 'VARP',
+}
+
+# Operators accepted by TabularCellRange.filter mapped to names
+# of com.sun.star.sheet.FilterOperator values.
+_FILTER_OPERATORS = {
+    '=': 'EQUAL',
+    '!=': 'NOT_EQUAL',
+    '<': 'LESS',
+    '<=': 'LESS_EQUAL',
+    '>': 'GREATER',
+    '>=': 'GREATER_EQUAL',
+    'empty': 'EMPTY',
+    'not_empty': 'NOT_EMPTY',
+}
+
+# UNO constants are resolved when they are accessed for the first time
+# (see __getattr__ below). Every lookup takes some time which slows down
+# import of this module while most of the constants are never used.
+_UNO_CONSTANTS = {
+    # Number format choices
+    'FORMAT_TEXT': 'com.sun.star.i18n.NumberFormatIndex.TEXT',
+    'FORMAT_INT': 'com.sun.star.i18n.NumberFormatIndex.NUMBER_INT',
+    'FORMAT_FLOAT': 'com.sun.star.i18n.NumberFormatIndex.NUMBER_DEC2',
+    'FORMAT_INT_SEP': 'com.sun.star.i18n.NumberFormatIndex.NUMBER_1000INT',
+    'FORMAT_FLOAT_SEP': 'com.sun.star.i18n.NumberFormatIndex.NUMBER_1000DEC2',
+    'FORMAT_PERCENT_INT': 'com.sun.star.i18n.NumberFormatIndex.PERCENT_INT',
+    'FORMAT_PERCENT_FLOAT': 'com.sun.star.i18n.NumberFormatIndex.PERCENT_DEC2',
+    'FORMAT_DATE': 'com.sun.star.i18n.NumberFormatIndex.DATE_SYSTEM_SHORT',
+    'FORMAT_TIME': 'com.sun.star.i18n.NumberFormatIndex.TIME_HHMM',
+    'FORMAT_DATETIME': 'com.sun.star.i18n.NumberFormatIndex.DATETIME_SYSTEM_SHORT_HHMM',
+
+    # Font weight choices
+    'FONT_WEIGHT_DONTKNOW': 'com.sun.star.awt.FontWeight.DONTKNOW',
+    'FONT_WEIGHT_THIN': 'com.sun.star.awt.FontWeight.THIN',
+    'FONT_WEIGHT_ULTRALIGHT': 'com.sun.star.awt.FontWeight.ULTRALIGHT',
+    'FONT_WEIGHT_LIGHT': 'com.sun.star.awt.FontWeight.LIGHT',
+    'FONT_WEIGHT_SEMILIGHT': 'com.sun.star.awt.FontWeight.SEMILIGHT',
+    'FONT_WEIGHT_NORMAL': 'com.sun.star.awt.FontWeight.NORMAL',
+    'FONT_WEIGHT_SEMIBOLD': 'com.sun.star.awt.FontWeight.SEMIBOLD',
+    'FONT_WEIGHT_BOLD': 'com.sun.star.awt.FontWeight.BOLD',
+    'FONT_WEIGHT_ULTRABOLD': 'com.sun.star.awt.FontWeight.ULTRABOLD',
+    'FONT_WEIGHT_BLACK': 'com.sun.star.awt.FontWeight.BLACK',
+
+    # Text underline choices (only first three are present here)
+    'UNDERLINE_NONE': 'com.sun.star.awt.FontUnderline.NONE',
+    'UNDERLINE_SINGLE': 'com.sun.star.awt.FontUnderline.SINGLE',
+    'UNDERLINE_DOUBLE': 'com.sun.star.awt.FontUnderline.DOUBLE',
+
+    # Axis choices
+    'AXIS_PRIMARY': 'com.sun.star.chart.ChartAxisAssign.PRIMARY_Y',
+    'AXIS_SECONDARY': 'com.sun.star.chart.ChartAxisAssign.SECONDARY_Y',
+}
 
 # Exceptions thrown by UNO.
 # We try to catch them and re-throw Python standard exceptions.
-_IndexOutOfBoundsException = uno.getClass('com.sun.star.lang.IndexOutOfBoundsException')
-_NoSuchElementException = uno.getClass('com.sun.star.container.NoSuchElementException')
-_IOException = uno.getClass('com.sun.star.io.IOException')
+_UNO_CLASSES = {
+    'IndexOutOfBoundsException': 'com.sun.star.lang.IndexOutOfBoundsException',
+    'NoSuchElementException': 'com.sun.star.container.NoSuchElementException',
+    'IOException': 'com.sun.star.io.IOException',
+    'IllegalArgumentException': 'com.sun.star.lang.IllegalArgumentException',
+
+    'NoConnectException': 'com.sun.star.connection.NoConnectException',
+    'ConnectionSetupException': 'com.sun.star.connection.ConnectionSetupException',
+
+    # Raised by a bridge when a connection to the office program is lost.
+    'RuntimeException': 'com.sun.star.uno.RuntimeException',
+    'DisposedException': 'com.sun.star.lang.DisposedException',
+
+    'Exception': 'com.sun.star.uno.Exception',
+}
+
+
+class _UnoClasses(object):
+    """
+    Namespace of UNO classes which are resolved when first accessed.
+    """
+
+    def __getattr__(self, name):
+        try:
+            value = uno.getClass(_UNO_CLASSES[name])
+        except KeyError:
+            raise AttributeError(name)
+        setattr(self, name, value)
+        return value
 
-_NoConnectException = uno.getClass('com.sun.star.connection.NoConnectException')
-_ConnectionSetupException = uno.getClass('com.sun.star.connection.ConnectionSetupException')
+_uno = _UnoClasses()
 
 
-UnoException = uno.getClass('com.sun.star.uno.Exception')
+def __getattr__(name):
+    """
+    Resolves public UNO constants when they are accessed first time.
+    """
+    if name == 'UnoException':
+        value = _uno.Exception
+    elif name in _UNO_CONSTANTS:
+        value = uno.getConstantByName(_UNO_CONSTANTS[name])
+    else:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    # Next access does not call this function.
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_UNO_CONSTANTS) | set(['UnoException']))
+
+
+# Public names, UNO constants are resolved by __getattr__ on star import.
+__all__ = [
+    'FILTER_PDF_EXPORT', 'FILTER_EXCEL_97', 'FILTER_EXCEL_2007',
+    'LOAD_OPTIONS_BATCH',
+    'TEXT_ALIGN_STANDARD', 'TEXT_ALIGN_LEFT', 'TEXT_ALIGN_CENTER',
+    'TEXT_ALIGN_RIGHT', 'TEXT_ALIGN_BLOCK', 'TEXT_ALIGN_REPEAT',
+    'FILL_MODE_SIMPLE', 'FILL_MODE_LINEAR', 'FILL_MODE_GROWTH',
+    'FILL_MODE_DATE', 'FILL_MODE_AUTO',
+    'FILL_DATE_DAY', 'FILL_DATE_WEEKDAY', 'FILL_DATE_MONTH', 'FILL_DATE_YEAR',
+    'POOL_ROUND_ROBIN', 'POOL_LEAST_BUSY',
+    'PY2', 'PY3', 'string_types', 'integer_types', 'text_type', 'str_repr',
+    'OfficeTimeoutError', 'UnoException',
+    'SheetPosition', 'SheetAddress', 'NamedCollection',
+    'DiagramSeries', 'DiagramSeriesCollection',
+    'Axis', 'XAxis', 'YAxis', 'SecondaryXAxis', 'SecondaryYAxis',
+    'Diagram', 'BarDiagram', 'LineDiagram', 'Chart', 'ChartCollection',
+    'SheetCursor', 'CellRange', 'Cell', 'TabularCellRange',
+    'HorizontalCellRange', 'VerticalCellRange', 'Sheet',
+    'SpreadsheetCollection', 'Locale', 'SpreadsheetDocument',
+    'Watchdog', 'Desktop', 'LazyDesktop', 'RecyclePolicy', 'OfficeProcess',
+    'DesktopPool', 'ConversionResult', 'convert_many',
+    'AsyncDesktop', 'AsyncSpreadsheetDocument', 'AsyncCellRange',
+    'NameGenerator',
+] + sorted(_UNO_CONSTANTS)
+
+
+if sys.version_info < (3, 7):
+    # Module level __getattr__ is not supported, resolve all now.
+    for _name in itertools.chain(_UNO_CONSTANTS, ['UnoException']):
+        __getattr__(_name)
+    del _name
+
+
+class OfficeTimeoutError(IOError):
+    """
+    Raised when an office operation exceeds its deadline.
+
+    The office program which did not respond in time is killed
+    and restarted.
+    """
 
 
 PY2 = sys.version_info[0] == 2
@@ -84,11 +242,13 @@ if PY3:
     string_types = str,
     integer_types = int,
     text_type = str
+    import queue
 else:
     string_types = basestring,
     integer_types = (int, long)
     text_type = unicode
     range = xrange
+    import Queue as queue
 
 
 def str_repr(klass):
@@ -341,6 +501,325 @@ class SheetAddress(object):
         return struct
 
 
+# Default number of rows read or written by one UNO call
+# when large ranges are processed in chunks.
+_CHUNK_ROWS = 1000
+
+# Types of values which are passed to UNO without any conversion.
+_PLAIN_TYPES = frozenset((float, bool, str, text_type))
+
+# Maximal number of cells in one write which is buffered in a batch,
+# larger writes are sent immediately.
+_BATCH_MAX_CELLS = 1000
+
+# Cost of one UNO call expressed as a number of transferred cells,
+# used to decide between writing many small blocks of cells and
+# rewriting one larger block.
+_CALL_COST = 100
+
+# Range of integers accepted by UNO, OpenOffice raises RuntimeError
+# for integers outside of 32-bit integers.
+_INT_MIN, _INT_MAX = -2147483648, 2147483647
+
+
+def _trim_address(address, used, rows=True, cols=True):
+    """
+    Trims rows and/or columns of an address which are after a used area.
+
+    At least one row and column is always kept.
+
+    >>> print(_trim_address(SheetAddress(0, 0, 100, 100), SheetAddress(0, 0, 10, 5)))
+    $A$1:$E$10
+    >>> print(_trim_address(SheetAddress(20, 0, 100, 1), SheetAddress(0, 0, 10, 5)))
+    $A$21
+
+    """
+    row_count, col_count = address.row_count, address.col_count
+    if rows:
+        row_count = max(1, min(address.row_end, used.row_end) - address.row + 1)
+    if cols:
+        col_count = max(1, min(address.col_end, used.col_end) - address.col + 1)
+    return address.replace(row_count=row_count, col_count=col_count)
+
+
+def _coalesce_cells(cells):
+    """
+    Groups cells into rectangles which can be written by one UNO call.
+
+    Cells is a dictionary mapping (row, column) to a value. Adjacent
+    cells in a row are joined into runs, runs with same columns in
+    adjacent rows are joined into rectangles. Returns a list
+    of (address, tuple of tuples) pairs.
+
+    >>> cells = {(0, 0): 1, (0, 1): 2, (1, 0): 3, (1, 1): 4, (1, 3): 5}
+    >>> [(str(a), v) for a, v in _coalesce_cells(cells)]
+    [('$A$1:$B$2', ((1, 2), (3, 4))), ('$D$2', ((5,),))]
+
+    """
+    runs = []
+    for row, col in sorted(cells):
+        if runs and runs[-1][0] == row and runs[-1][1] + len(runs[-1][2]) == col:
+            runs[-1][2].append(cells[row, col])
+        else:
+            runs.append((row, col, [cells[row, col]]))
+    rectangles = []
+    open_rectangles = {}
+    for row, col, values in runs:
+        key = col, len(values)
+        rectangle = open_rectangles.get(key)
+        if rectangle is not None and rectangle[0] + len(rectangle[2]) == row:
+            rectangle[2].append(tuple(values))
+        else:
+            rectangle = open_rectangles[key] = (row, col, [tuple(values)])
+            rectangles.append(rectangle)
+    return [(SheetAddress(row, col, len(rows), len(rows[0])), tuple(rows))
+            for row, col, rows in rectangles]
+
+
+class _WriteBuffer(object):
+    """
+    Values and formulas written to a sheet inside a batch.
+    """
+
+    __slots__ = ('data', 'formulas')
+
+    def __init__(self):
+        # Both dictionaries map (row, column) to a value, each cell
+        # is in one of them only, so the last write wins.
+        self.data = {}
+        self.formulas = {}
+
+    def __len__(self):
+        return len(self.data) + len(self.formulas)
+
+    def add(self, address, array, formulas=False):
+        """
+        Adds a tuple of tuples written to the given address.
+
+        Returns False if the array does not match the address
+        and has to be written directly.
+        """
+        if len(array) != address.row_count or any(len(row) != address.col_count for row in array):
+            return False
+        cells, other = (self.formulas, self.data) if formulas else (self.data, self.formulas)
+        for i, row in enumerate(array):
+            for j, value in enumerate(row):
+                key = address.row + i, address.col + j
+                cells[key] = value
+                other.pop(key, None)
+        return True
+
+
+class _Snapshot(object):
+    """
+    Values and formulas of a used area of a sheet read at once.
+    """
+
+    __slots__ = ('sheet', 'address', 'data', 'formulas', 'listener')
+
+    def __init__(self, sheet):
+        self.sheet = sheet
+        self.address = None # Used area, None if not loaded.
+        self.data = None
+        self.formulas = None # Loaded when first needed.
+        self.listener = None # XModifyListener if registered.
+
+    def clear(self):
+        """
+        Drops loaded values, they are read again when needed.
+        """
+        self.address = self.data = self.formulas = None
+
+    def load(self):
+        """
+        Reads the used area if it is not loaded.
+
+        Returns address of the used area and its values.
+        """
+        # Local variables are used because the listener can clear
+        # the snapshot from another thread.
+        address, data = self.address, self.data
+        if address is None or data is None:
+            sheet = self.sheet
+            address = sheet._read_used_address()
+            data = sheet._get_target(address).getDataArray()
+            self.address, self.data, self.formulas = address, data, None
+        return address, data
+
+    def get(self, address, formulas=False):
+        """
+        Returns values (or formulas) in the given address as tuple of tuples.
+
+        Cells outside of the used area are empty.
+        """
+        used, source = self.load()
+        if formulas:
+            source = self.formulas
+            if source is None:
+                source = self.formulas = self.sheet._get_target(used).getFormulaArray()
+        col_start = max(address.col, used.col)
+        col_end = min(address.col_end, used.col_end)
+        if col_start > col_end:
+            empty = ('',) * address.col_count
+            return (empty,) * address.row_count
+        before = ('',) * (col_start - address.col)
+        after = ('',) * (address.col_end - col_end)
+        empty = ('',) * address.col_count
+        rows = []
+        for row in range(address.row, address.row_end + 1):
+            if used.row <= row <= used.row_end:
+                values = source[row - used.row][col_start - used.col:col_end - used.col + 1]
+                rows.append(before + values + after if before or after else values)
+            else:
+                rows.append(empty)
+        return tuple(rows)
+
+
+def _is_finite_number(value):
+    """
+    Returns True if the value is an integer or a finite float.
+    """
+    cls = value.__class__
+    if cls in integer_types:
+        return True
+    return cls is float and not (math.isinf(value) or math.isnan(value))
+
+
+def _get_fill_direction(right):
+    """
+    Returns UNO fill direction to the right or to the bottom.
+    """
+    return uno.Enum('com.sun.star.sheet.FillDirection', 'TO_RIGHT' if right else 'TO_BOTTOM')
+
+
+def _import_numpy():
+    """
+    Imports optional NumPy dependency.
+    """
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError('NumPy is required for conversion to and from arrays.')
+    return numpy
+
+
+def _numpy_from_data(data, dtype, masked, document):
+    """
+    Converts a tuple of tuples read from UNO to a two dimensional array.
+
+    Text and empty cells are converted to NaN (or NaT) unless the object
+    dtype is requested. Dates are computed from numbers using the null
+    date of the document.
+    """
+    np = _import_numpy()
+    dtype = np.dtype(dtype)
+    shape = (len(data), len(data[0]) if data else 0)
+    if dtype.kind == 'O':
+        array = np.empty(shape, dtype=object)
+        array[:] = data
+        return array
+    # Numbers are always returned as floats by UNO, anything else is not a number.
+    nan = float('nan')
+    values = (v if v.__class__ is float else nan for row in data for v in row)
+    array = np.fromiter(values, dtype=np.float64, count=shape[0] * shape[1]).reshape(shape)
+    missing = np.isnan(array)
+    if dtype.kind == 'M':
+        null_date = np.datetime64(document._null_date, 'us')
+        microseconds = np.where(missing, 0, np.round(array * 86400e6)).astype(np.int64)
+        array = (null_date + microseconds.astype('timedelta64[us]')).astype(dtype)
+        array[missing] = np.datetime64('NaT')
+    elif dtype.kind != 'f':
+        if missing.any():
+            raise ValueError('Empty or text cells can not be converted to %s.' % dtype)
+        array = array.astype(dtype)
+    if masked:
+        array = np.ma.masked_array(array, mask=missing)
+    return array
+
+
+def _numpy_to_uno(array, document):
+    """
+    Converts an array to values which can be passed to UNO.
+
+    Conversion is vectorized, NaN and NaT values are converted to
+    empty strings (empty cells). Returns None for object arrays which
+    have to be converted value by value.
+    """
+    np = _import_numpy()
+    array = np.asarray(array)
+    kind = array.dtype.kind
+    if kind == 'M':
+        null_date = np.datetime64(document._null_date, 'us')
+        array = (array - null_date) / np.timedelta64(1, 'D')
+    elif kind == 'm':
+        array = array / np.timedelta64(1, 'D')
+    elif kind in 'iu' and array.size:
+        # OpenOffices raises RuntimeError for integers outside of
+        # 32-bit integers
+        if array.min() < -2147483648 or array.max() > 2147483647:
+            array = array.astype(np.float64)
+    elif kind == 'S':
+        array = np.char.decode(array, 'utf-8')
+    elif kind == 'O':
+        return None
+    if array.dtype.kind == 'f':
+        missing = np.isnan(array)
+        if missing.any():
+            array = array.astype(object)
+            array[missing] = ''
+    return array
+
+
+def _data_from_numpy(array, document):
+    """
+    Converts a two dimensional array to a tuple of tuples for UNO.
+
+    Returns None for object arrays.
+    """
+    array = _numpy_to_uno(array, document)
+    if array is None:
+        return None
+    return tuple(map(tuple, array.tolist()))
+
+
+def _import_pandas():
+    """
+    Imports optional pandas dependency.
+    """
+    try:
+        import pandas
+    except ImportError:
+        raise ImportError('Pandas is required for conversion to and from data frames.')
+    return pandas
+
+
+def _get_column_names(header):
+    """
+    Returns unique names of data frame columns from a header row.
+
+    Whole numbers are formatted without decimals, blank names are
+    replaced by column indices and repeated names get a numeric suffix
+    (same as pandas.read_csv does).
+
+    >>> _get_column_names(['a', '', 'a', 2016.0])
+    ['a', 'Unnamed: 1', 'a.1', '2016']
+
+    """
+    names = []
+    used = set()
+    for i, value in enumerate(header):
+        if value.__class__ is float and value.is_integer():
+            value = int(value)
+        name = text_type(value) if value != '' else 'Unnamed: %d' % i
+        unique, count = name, 0
+        while unique in used:
+            count += 1
+            unique = '%s.%d' % (name, count)
+        used.add(unique)
+        names.append(unique)
+    return names
+
+
 class _UnoProxy(object):
     """
     Abstract base class for objects which act as a proxy to UNO objects.
@@ -388,14 +867,14 @@ class NamedCollection(_UnoProxy):
         try:
             # http://www.openoffice.org/api/docs/common/ref/com/sun/star/container/XIndexAccess.html#getByIndex
             return self._target.getByIndex(index)
-        except _IndexOutOfBoundsException:
+        except _uno.IndexOutOfBoundsException:
             raise IndexError(index)
 
     def _get_by_name(self, name):
         try:
             # http://www.openoffice.org/api/docs/common/ref/com/sun/star/container/XNameAccess.html#getByName
             return self._target.getByName(name)
-        except _NoSuchElementException:
+        except _uno.NoSuchElementException:
             raise KeyError(name)
 
 
@@ -466,7 +945,7 @@ class DiagramSeriesCollection(_UnoProxy):
     def __getitem__(self, key):
         try:
             target = self._target.getDataRowProperties(key)
-        except _IndexOutOfBoundsException:
+        except _uno.IndexOutOfBoundsException:
             raise IndexError(key)
         else:
             return DiagramSeries(target)
@@ -882,7 +1361,7 @@ class ChartCollection(NamedCollection):
     def _delete(self, name):
         try:
             self._target.removeByName(name)
-        except _NoSuchElementException:
+        except _uno.NoSuchElementException:
             raise KeyError(name)
 
 
@@ -1188,22 +1667,307 @@ class CellRange(object):
     inner_border_width = property(__get_inner_border_width,
                                   __set_inner_border_width)
 
+    def fill_down(self, formula=None, source_rows=1):
+        """
+        Fills this cell range down from its first source_rows rows.
+
+        If a formula is given then it is set to all cells in the first
+        row before. Filling is done by the office (like dragging a fill
+        handle), so relative references in formulas are adjusted and
+        series of numbers and dates are continued.
+        """
+        self._fill_auto(False, formula, source_rows, self.address.row_count)
+
+    def fill_right(self, formula=None, source_cols=1):
+        """
+        Fills this cell range right from its first source_cols columns.
+
+        See fill_down for details.
+        """
+        self._fill_auto(True, formula, source_cols, self.address.col_count)
+
+    def fill_series(self, start=None, step=1, end=None, mode=FILL_MODE_LINEAR,
+                    date_mode=FILL_DATE_DAY, right=False):
+        """
+        Fills this cell range with a series of numbers or dates.
+
+        The series starts with values in the first row (or the first column
+        if right is True) which can be set using the start argument. Step is
+        added to (or multiplied by for FILL_MODE_GROWTH) previous values until
+        the end value or the end of this range is reached. Accepts FILL_MODE_*
+        and FILL_DATE_* constants.
+        """
+        if start is not None:
+            first = self._get_first_address(right)
+            value = self._clean_value(start)
+            self._get_target(first).setDataArray(((value,) * first.col_count,) * first.row_count)
+        if end is None:
+            end = sys.float_info.max if step >= 0 else -sys.float_info.max
+        else:
+            end = self._convert(end)
+        self.sheet._invalidate()
+        self._get_target().fillSeries(_get_fill_direction(right),
+                                      uno.Enum('com.sun.star.sheet.FillMode', mode),
+                                      uno.Enum('com.sun.star.sheet.FillDateMode', date_mode),
+                                      step, end)
+
+    def copy_to(self, destination):
+        """
+        Copies this cell range including formats to another position.
+
+        Destination is a cell or a cell range (only its top left cell is
+        used) in any sheet of the same document. Cells are copied by the
+        office, relative references in formulas are adjusted. Returns
+        the destination range.
+        """
+        return self._move_to(destination, copy=True)
+
+    def move_to(self, destination):
+        """
+        Moves this cell range including formats to another position.
+
+        Cells of this range are cleared. References to moved cells are
+        updated. See copy_to for details.
+        """
+        return self._move_to(destination, copy=False)
+
+    def aggregate(self, function):
+        """
+        Computes an aggregate function of values in this cell range.
+
+        Function is one of 'sum', 'count' (non-empty cells),
+        'count_numbers', 'average', 'max', 'min', 'product', 'stdev',
+        'stdevp', 'var' or 'varp'. The value is computed by the office,
+        so only the result is transferred. Returns a float.
+        """
+        return self._aggregate(self._get_target(), function)
+
+    def aggregates(self, functions):
+        """
+        Computes several aggregate functions of values in this cell range.
+
+        Returns a dictionary mapping functions to their values,
+        see aggregate for supported functions.
+        """
+        target = self._get_target()
+        return dict((function, self._aggregate(target, function)) for function in functions)
+
     # Internal methods:
 
-    def _get_target(self):
+    def _aggregate(self, target, function):
+        """
+        Computes an aggregate function using XSheetOperation.
+        """
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/sheet/XSheetOperation.html
+        try:
+            name = _AGGREGATE_FUNCTIONS[function]
+        except KeyError:
+            raise ValueError('Unknown aggregate function: %r' % (function,))
+        function_enum = uno.Enum('com.sun.star.sheet.GeneralFunction', name)
+        try:
+            return target.computeFunction(function_enum)
+        except _uno.DisposedException:
+            raise
+        except _uno.RuntimeException:
+            # E.g. average of cells without numbers.
+            raise ValueError('Function %r can not be computed for %s.' % (function, self))
+
+    def _move_to(self, destination, copy):
+        """
+        Copies or moves this cell range using XCellRangeMovement.
+        """
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/sheet/XCellRangeMovement.html
+        sheet, target_sheet = self.sheet, destination.sheet
+        if sheet.document._target != target_sheet.document._target:
+            raise ValueError('Cells can be copied only within one document.')
+        sheet._sync()
+        target_sheet._sync()
+        cell = uno.createUnoStruct('com.sun.star.table.CellAddress')
+        cell.Sheet = target_sheet.index
+        cell.Column = destination.address.col
+        cell.Row = destination.address.row
+        source = self.address._to_uno(sheet.index)
+        if copy:
+            sheet._target.copyRange(cell, source)
+        else:
+            sheet._target.moveRange(cell, source)
+        address = self.address.replace(row=destination.address.row, col=destination.address.col)
+        cls = TabularCellRange if isinstance(self, Sheet) else self.__class__
+        return cls(target_sheet, address)
+
+    def _get_first_address(self, right):
+        """
+        Returns address of the first column (if right is True) or row.
+        """
+        if right:
+            return self.address.replace(col_count=1)
+        return self.address.replace(row_count=1)
+
+    def _fill_auto(self, right, formula, source_count, count):
+        """
+        Fills this cell range from first source_count rows or columns.
+        """
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/sheet/XCellSeries.html
+        if not 0 < source_count <= count:
+            raise ValueError('Source count must be between 1 and %d.' % count)
+        if formula is not None:
+            first = self._get_first_address(right)
+            formula = self._clean_formula(formula)
+            self._get_target(first).setFormulaArray(((formula,) * first.col_count,) * first.row_count)
+        self.sheet._invalidate()
+        self._get_target().fillAuto(_get_fill_direction(right), source_count)
+
+    def _get_target(self, address=None):
         """
         Returns cursor which can be used for most of operations.
         """
-        address = self.address
+        # Buffered writes must be sent before any other operation.
+        if self.sheet._batch:
+            self.sheet._flush()
+        if address is None:
+            address = self.address
         cursor = self.sheet.cursor
         return cursor.get_target(address.row, address.col,
                                  address.row_count, address.col_count)
 
+    def _get_read_address(self):
+        """
+        Returns address which should be used for bulk reads.
+
+        Rows and columns reaching the end of the sheet (e.g. sheet[:, 0])
+        are trimmed to the used area, so the whole sheet is never read.
+        """
+        address = self.address
+        cursor = self.sheet.cursor
+        rows = address.row_end == cursor.max_row_count - 1
+        cols = address.col_end == cursor.max_col_count - 1
+        if not rows and not cols:
+            return address
+        return _trim_address(address, self.sheet._get_used_address(), rows, cols)
+
+    def _get_data_array(self):
+        address = self._get_read_address()
+        if self.sheet._snapshot is not None:
+            return self.sheet._snapshot.get(address)
+        return self._get_target(address).getDataArray()
+
+    def _get_formula_array(self):
+        address = self._get_read_address()
+        if self.sheet._snapshot is not None:
+            return self.sheet._snapshot.get(address, formulas=True)
+        return self._get_target(address).getFormulaArray()
+
+    def _set_array(self, array, formulas=False):
+        """
+        Sets values (or formulas) in this cell range from a tuple of tuples.
+
+        Small writes are only buffered if a batch is active in the sheet.
+        """
+        address = self.address
+        self.sheet._invalidate()
+        batch = self.sheet._batch
+        if (batch is not None and address.row_count * address.col_count <= _BATCH_MAX_CELLS
+                and batch.add(address, array, formulas)):
+            return
+        target = self._get_target()
+        if formulas:
+            target.setFormulaArray(array)
+        else:
+            target.setDataArray(array)
+
+    def _update_array(self, array):
+        """
+        Sets values from a tuple of tuples only to cells which differ.
+
+        Values are written from the top left cell of this range.
+        Returns number of written cells.
+        """
+        if not array:
+            return 0
+        width = len(array[0])
+        if any(len(row) != width for row in array):
+            raise ValueError('All rows must have length %d.' % width)
+        if len(array) > self.address.row_count or width > self.address.col_count:
+            raise ValueError('Values do not fit in range %s.' % self.address)
+        address = self.address.replace(row_count=len(array), col_count=width)
+        snapshot = self.sheet._snapshot
+        if snapshot is not None:
+            current = snapshot.get(address)
+        else:
+            current = self._get_target(address).getDataArray()
+        changed = {}
+        for row, (old_values, new_values) in enumerate(zip(current, array), address.row):
+            if old_values == new_values:
+                continue
+            for col, (old, new) in enumerate(zip(old_values, new_values), address.col):
+                # Empty cells are read as empty strings.
+                if old != new and not (new is None and old == ''):
+                    changed[row, col] = new
+        if changed:
+            self.sheet._invalidate()
+            for block, values in _coalesce_cells(changed):
+                self._get_target(block).setDataArray(values)
+        return len(changed)
+
+    def _get_numeric_array(self):
+        """
+        Reads numbers using XChartDataArray interface.
+
+        Returns a tuple of array('d') rows. UNO transfers the numbers as
+        sequences of doubles, so no values have to be unboxed one by one.
+        """
+        address = self._get_read_address()
+        target = self._get_target(address)
+        data = target.getData()
+        nan = float('nan')
+        if len(data) != address.row_count or any(len(v) != address.col_count for v in data):
+            # Chart data leave out hidden (e.g. filtered) rows and columns,
+            # so all the values are read as by the values property instead.
+            return tuple(array.array('d', (v if v.__class__ is float else nan for v in values))
+                         for values in self._get_data_array())
+        # Text and empty cells are returned as a special value
+        # which is replaced by NaN.
+        not_a_number = target.getNotANumber()
+        rows = []
+        for values in data:
+            row = array.array('d', values)
+            if not_a_number in row:
+                for i, value in enumerate(row):
+                    if value == not_a_number:
+                        row[i] = nan
+            rows.append(row)
+        return tuple(rows)
+
+    def _iter_arrays(self, chunk_rows, formulas=False):
+        """
+        Reads data or formulas in blocks of rows.
+
+        Yields one tuple of tuples per block.
+        """
+        if chunk_rows < 1:
+            raise ValueError('Chunk must contain at least one row.')
+        address = self._get_read_address()
+        row_stop = address.row + address.row_count
+        for row in range(address.row, row_stop, chunk_rows):
+            chunk = address.replace(row=row, row_count=min(chunk_rows, row_stop - row))
+            # Cursor is moved in every step because it can be used
+            # by a caller between two chunks.
+            target = self._get_target(chunk)
+            if formulas:
+                yield target.getFormulaArray()
+            else:
+                yield target.getDataArray()
+
     def _convert(self, value):
+        # Exact types are looked up first, isinstance() checks
+        # of abstract types are much slower.
+        cls = value.__class__
+        if cls in _PLAIN_TYPES:
+            return value
+        if cls in integer_types:
+            return value if _INT_MIN <= value <= _INT_MAX else float(value)
         if isinstance(value, numbers.Real):
-            # OpenOffices raises RuntimeError for integers outside of
-            # 32-bit integers
-            if -2147483648 <= value <= 2147483647:
+            if _INT_MIN <= value <= _INT_MAX:
                 return value
             else:
                 return float(value)
@@ -1215,6 +1979,49 @@ class CellRange(object):
             return self.sheet.document.time_to_number(value)
         return text_type(value)
 
+    def _compile_converter(self, type_):
+        """
+        Returns function converting a column of values of the given type.
+
+        None type converts values of any type. None values are kept
+        in all columns.
+        """
+        if type_ is None:
+            clean = self._clean_value
+            return lambda column: [clean(v) for v in column]
+        if type_ in _PLAIN_TYPES or type_ in string_types:
+            return list
+        if type_ in integer_types:
+            return lambda column: [v if v is None or _INT_MIN <= v <= _INT_MAX else float(v)
+                                   for v in column]
+        null_date = self.sheet.document._null_date
+        if type_ is datetime.datetime:
+            def convert(value):
+                if value is None:
+                    return None
+                delta = value - null_date
+                return delta.days + delta.seconds / (24.0 * 60 * 60)
+            return lambda column: [convert(v) for v in column]
+        if type_ is datetime.date:
+            null_ordinal = null_date.toordinal()
+            return lambda column: [v if v is None else v.toordinal() - null_ordinal
+                                   for v in column]
+        if type_ is datetime.time:
+            return lambda column: [v if v is None else
+                                   ((v.second / 60.0 + v.minute) / 60.0 + v.hour) / 24.0
+                                   for v in column]
+        raise TypeError('Unsupported column type: %r' % (type_,))
+
+    def _to_numpy(self, dtype, masked):
+        return _numpy_from_data(self._get_data_array(), dtype, masked, self.sheet.document)
+
+    def _from_numpy(self, array):
+        data = _data_from_numpy(array, self.sheet.document)
+        if data is None:
+            # Object arrays are converted value by value.
+            data = tuple(tuple(self._clean_value(v) for v in row) for row in array.tolist())
+        self._set_array(data)
+
     def _clean_value(self, value):
         """
         Validates and converts value before assigning it to a cell.
@@ -1247,14 +2054,14 @@ class Cell(CellRange):
         """
         Gets cell value with as a string or number based on cell type.
         """
-        array = self._get_target().getDataArray()
+        array = self._get_data_array()
         return array[0][0]
     def __set_value(self, value):
         """
         Sets cell value to a string or number based on the given value.
         """
         array = ((self._clean_value(value),),)
-        return self._get_target().setDataArray(array)
+        self._set_array(array)
     value = property(__get_value, __set_value)
 
     def __get_formula(self):
@@ -1264,7 +2071,7 @@ class Cell(CellRange):
         If this cell contains actual formula then the returned value starts
         with an equal sign but any cell value is returned.
         """
-        array = self._get_target().getFormulaArray()
+        array = self._get_formula_array()
         return array[0][0]
     def __set_formula(self, formula):
         """
@@ -1274,7 +2081,7 @@ class Cell(CellRange):
         start with an equal sign.
         """
         array = ((self._clean_formula(formula),),)
-        return self._get_target().setFormulaArray(array)
+        self._set_array(array, formulas=True)
     formula = property(__get_formula, __set_formula)
 
     @property
@@ -1351,16 +2158,18 @@ class TabularCellRange(CellRange):
     def __get_values(self):
         """
         Gets values in this cell range as a tuple of tuples.
+
+        Rows and columns reaching the end of the sheet are read only
+        up to the end of the used area.
         """
-        array = self._get_target().getDataArray()
-        return array
+        return self._get_data_array()
     def __set_values(self, values):
         """
         Sets values in this cell range from an iterable of iterables.
         """
         # Tuple of tuples is required
         array = tuple(tuple(self._clean_value(col) for col in row) for row in values)
-        self._get_target().setDataArray(array)
+        self._set_array(array)
     values = property(__get_values, __set_values)
 
     def __get_formulas(self):
@@ -1370,7 +2179,7 @@ class TabularCellRange(CellRange):
         If cells contain actual formulas then the returned values start
         with an equal sign  but all values are returned.
         """
-        return self._get_target().getFormulaArray()
+        return self._get_formula_array()
     def __set_formulas(self, formulas):
         """
         Sets formulas in this cell range from an iterable of iterables.
@@ -1380,9 +2189,288 @@ class TabularCellRange(CellRange):
         """
         # Tuple of tuples is required
         array = tuple(tuple(self._clean_formula(col) for col in row) for row in formulas)
-        self._get_target().setFormulaArray(array)
+        self._set_array(array, formulas=True)
     formulas = property(__get_formulas, __set_formulas)
 
+    def column_aggregates(self, functions):
+        """
+        Computes aggregate functions of each column in this cell range.
+
+        Returns a list with one dictionary per column mapping functions
+        to their values, see CellRange.aggregate. Columns reaching
+        the end of the sheet are computed only up to the used area.
+        """
+        result = []
+        address = self._get_read_address()
+        for col in range(address.col, address.col + address.col_count):
+            column = VerticalCellRange(self.sheet, address.replace(col=col, col_count=1))
+            target = column._get_target()
+            result.append(dict((function, column._aggregate(target, function))
+                               for function in functions))
+        return result
+
+    def sort(self, keys=((0, True),), has_header=False, case_sensitive=False):
+        """
+        Sorts rows of this cell range in place.
+
+        Keys is a sequence of (column, ascending) pairs where columns
+        are indexed from the first column of this range. If has_header
+        is True then the first row is not sorted. Rows are sorted by the
+        office without transferring any values. Ranges reaching the end
+        of the sheet are sorted only up to the end of the used area.
+        """
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/util/XSortable.html
+        fields = []
+        for col, ascending in keys:
+            field = uno.createUnoStruct('com.sun.star.table.TableSortField')
+            field.Field = col
+            field.IsAscending = ascending
+            field.IsCaseSensitive = case_sensitive
+            fields.append(field)
+        # Sequence of structs in an Any value has to be typed explicitly.
+        fields = uno.Any('[]com.sun.star.table.TableSortField', tuple(fields))
+        descriptor = (_property_value('SortFields', fields),
+                      _property_value('ContainsHeader', has_header),
+                      _property_value('IsSortColumns', False))
+        self.sheet._sync()
+        target = self._get_target(self._get_read_address())
+        uno.invoke(target, 'sort', (descriptor,))
+
+    def filter(self, conditions, has_header=False, match_any=False):
+        """
+        Hides rows of this cell range which do not match conditions.
+
+        Conditions is a sequence of (column, operator, value) tuples where
+        columns are indexed from the first column of this range. Supported
+        operators are '=', '!=', '<', '<=', '>', '>=', 'empty' and
+        'not_empty' (value is ignored). All the conditions must match
+        unless match_any is True. If has_header is True then the first
+        row is always visible. Rows are filtered by the office.
+        """
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/sheet/XSheetFilterable.html
+        connection = uno.Enum('com.sun.star.sheet.FilterConnection', 'OR' if match_any else 'AND')
+        fields = []
+        for col, operator, value in conditions:
+            try:
+                operator = _FILTER_OPERATORS[operator]
+            except KeyError:
+                raise ValueError('Unknown filter operator: %r' % (operator,))
+            field = uno.createUnoStruct('com.sun.star.sheet.TableFilterField')
+            field.Connection = connection
+            field.Field = col
+            field.Operator = uno.Enum('com.sun.star.sheet.FilterOperator', operator)
+            value = self._clean_value(value)
+            if isinstance(value, string_types):
+                field.IsNumeric = False
+                field.StringValue = value
+            elif value is not None:
+                field.IsNumeric = True
+                field.NumericValue = value
+            fields.append(field)
+        self.sheet._sync()
+        target = self._get_target(self._get_read_address())
+        descriptor = target.createFilterDescriptor(True)
+        descriptor.setFilterFields(tuple(fields))
+        descriptor.setPropertyValue('ContainsHeader', has_header)
+        target.filter(descriptor)
+
+    def clear_filter(self):
+        """
+        Shows all rows hidden by filter.
+        """
+        self.sheet._sync()
+        target = self._get_target(self._get_read_address())
+        target.filter(target.createFilterDescriptor(True))
+
+    def update_values(self, values):
+        """
+        Sets values from an iterable of iterables only to changed cells.
+
+        Current values are read at once and only rectangles of cells
+        with different values are written. This is faster when most
+        of the values are unchanged. Cells are compared by values,
+        so a formula returning the new value is kept.
+
+        Returns number of written cells.
+        """
+        array = tuple(tuple(self._clean_value(col) for col in row) for row in values)
+        return self._update_array(array)
+
+    @property
+    def values_numeric(self):
+        """
+        Numbers in this cell range as a tuple of array('d') rows.
+
+        Text and empty cells are NaN. This is faster and uses less
+        memory than values for large numeric tables. Hidden rows and
+        columns are included, but then the numbers are read as slowly
+        as by values.
+        """
+        return self._get_numeric_array()
+
+    def iter_rows(self, chunk_rows=_CHUNK_ROWS, formulas=False):
+        """
+        Iterates over rows of values (or formulas) in this range.
+
+        Rows are read lazily in chunks of chunk_rows rows, so even large
+        ranges can be processed with limited memory.
+        """
+        for array in self._iter_arrays(chunk_rows, formulas):
+            for row in array:
+                yield row
+
+    def to_numpy(self, dtype=float, masked=False):
+        """
+        Returns values in this cell range as a two dimensional NumPy array.
+
+        By default a float array is returned where text and empty
+        cells are NaN (or masked if masked is True). Numbers can be
+        converted to dates using a datetime64 dtype, object dtype
+        returns values as they are.
+        """
+        return self._to_numpy(dtype, masked)
+
+    def from_numpy(self, array):
+        """
+        Sets values in this cell range from a two dimensional NumPy array.
+
+        NaN and NaT values are written as empty cells, datetime64 values
+        are converted to dates.
+        """
+        if array.ndim != 2:
+            raise ValueError('Two dimensional array is required.')
+        self._from_numpy(array)
+
+    def to_dataframe(self, header=True, parse_dates=(), chunk_rows=_CHUNK_ROWS):
+        """
+        Returns values in this cell range as a pandas DataFrame.
+
+        If header is True then the first row contains column names,
+        blank and repeated names are made unique (e.g. 'Unnamed: 1'
+        or 'a.1').
+        Columns which contain only numbers (and empty cells) are converted
+        to floats with NaN for empty cells, other columns contain objects
+        with None for empty cells. Numbers in columns listed in parse_dates
+        (names or indices) are converted to dates.
+
+        Values are read in chunks of chunk_rows rows.
+        """
+        pd = _import_pandas()
+        np = _import_numpy()
+        rows = []
+        for array in self._iter_arrays(chunk_rows):
+            rows.extend(array)
+        if header:
+            names = _get_column_names(rows[0])
+            rows = rows[1:]
+        else:
+            names = list(range(len(rows[0])))
+        columns = list(zip(*rows)) if rows else [()] * len(names)
+        arrays = []
+        for i, (name, column) in enumerate(zip(names, columns)):
+            if all(v.__class__ is float or v == '' for v in column):
+                dtype = 'datetime64[ns]' if name in parse_dates or i in parse_dates else float
+                array = _numpy_from_data((column,), dtype, False, self.sheet.document)[0]
+            else:
+                array = np.array([v if v != '' else None for v in column], dtype=object)
+            arrays.append(array)
+        # Columns are built by position, names are assigned afterwards.
+        frame = pd.DataFrame(dict(enumerate(arrays)), columns=range(len(arrays)))
+        frame.columns = names
+        return frame
+
+    def write_rows(self, rows, chunk_rows=_CHUNK_ROWS, formulas=False, extend=False):
+        """
+        Writes values (or formulas) from an iterable of rows.
+
+        Rows are consumed lazily and written in chunks of chunk_rows rows,
+        so even a generator of millions of rows (e.g. a database cursor)
+        can be written with limited memory. All rows must have same length
+        which can be lower than the number of columns in this range.
+
+        Writing more rows than this range contains raises ValueError unless
+        extend is True, then rows below this range are written too. The
+        error is raised after all the rows which fit in this range are
+        written, so the range is filled but the remaining rows are lost.
+
+        Returns number of written rows.
+        """
+        clean = self._clean_formula if formulas else self._clean_value
+        def clean_chunk(chunk):
+            return tuple(tuple(clean(v) for v in row) for row in chunk)
+        return self._write_chunks(rows, chunk_rows, extend, clean_chunk, formulas)
+
+    def write_typed(self, rows, types, chunk_rows=_CHUNK_ROWS, extend=False):
+        """
+        Writes values from an iterable of rows with known column types.
+
+        Types is a sequence with one type per column: int, float, bool,
+        str, datetime.date, datetime.datetime, datetime.time or None
+        (any type). Values are converted by whole columns without
+        checking type of every value, so this is faster than write_rows
+        for large tables. None values are allowed in all columns.
+
+        Rows are written in chunks as by write_rows (including rows
+        which fit before ValueError is raised for too many rows).
+        Returns number of written rows.
+        """
+        converters = [self._compile_converter(type_) for type_ in types]
+        def clean_chunk(chunk):
+            chunk = tuple(chunk)
+            if any(len(row) != len(converters) for row in chunk):
+                raise ValueError('All rows must have length %d.' % len(converters))
+            columns = [convert(column) for convert, column in zip(converters, zip(*chunk))]
+            return tuple(zip(*columns))
+        return self._write_chunks(rows, chunk_rows, extend, clean_chunk)
+
+    def _write_chunks(self, rows, chunk_rows, extend, clean_chunk, formulas=False):
+        """
+        Writes rows converted by clean_chunk function in chunks.
+        """
+        if chunk_rows < 1:
+            raise ValueError('Chunk must contain at least one row.')
+        self.sheet._invalidate()
+        address = self.address
+        if extend:
+            row_limit = self.sheet.cursor.max_row_count - address.row
+        else:
+            row_limit = address.row_count
+        width = None
+        count = 0
+        rows = iter(rows)
+        while True:
+            chunk = clean_chunk(itertools.islice(rows, chunk_rows))
+            if not chunk:
+                break
+            if width is None:
+                width = len(chunk[0])
+                if not 0 < width <= address.col_count:
+                    raise ValueError('Row length must be between 1 and %d.' % address.col_count)
+            if any(len(row) != width for row in chunk):
+                raise ValueError('All rows must have length %d.' % width)
+            overflow = count + len(chunk) > row_limit
+            if overflow:
+                # Rows which fit are written before the error is raised.
+                chunk = chunk[:row_limit - count]
+            if chunk:
+                target = self._get_target(SheetAddress(address.row + count, address.col,
+                                                       len(chunk), width))
+                if formulas:
+                    target.setFormulaArray(chunk)
+                else:
+                    target.setDataArray(chunk)
+                count += len(chunk)
+            if overflow:
+                raise ValueError('Range has only %d rows.' % row_limit)
+        return count
+
+    def trimmed(self):
+        """
+        Returns this range without rows and columns after the used area.
+        """
+        address = _trim_address(self.address, self.sheet._get_used_address())
+        return TabularCellRange(self.sheet, address)
+
 
 class HorizontalCellRange(CellRange):
     """
@@ -1416,14 +2504,14 @@ class HorizontalCellRange(CellRange):
         """
         Gets values in this cell range as a tuple.
         """
-        array = self._get_target().getDataArray()
+        array = self._get_data_array()
         return array[0]
     def __set_values(self, values):
         """
         Sets values in this cell range from an iterable.
         """
         array = (tuple(self._clean_value(v) for v in values),)
-        self._get_target().setDataArray(array)
+        self._set_array(array)
     values = property(__get_values, __set_values)
 
     def __get_formulas(self):
@@ -1433,7 +2521,7 @@ class HorizontalCellRange(CellRange):
         If cells contain actual formulas then the returned values start
         with an equal sign  but all values are returned.
         """
-        array = self._get_target().getFormulaArray()
+        array = self._get_formula_array()
         return array[0]
     def __set_formulas(self, formulas):
         """
@@ -1443,9 +2531,36 @@ class HorizontalCellRange(CellRange):
         start with an equal sign.
         """
         array = (tuple(self._clean_formula(v) for v in formulas),)
-        return self._get_target().setFormulaArray(array)
+        self._set_array(array, formulas=True)
     formulas = property(__get_formulas, __set_formulas)
 
+    def update_values(self, values):
+        """
+        Sets values from an iterable only to changed cells.
+
+        Returns number of written cells, see TabularCellRange.update_values.
+        """
+        array = (tuple(self._clean_value(v) for v in values),)
+        return self._update_array(array)
+
+    def to_numpy(self, dtype=float, masked=False):
+        """
+        Returns values in this cell range as a one dimensional NumPy array.
+
+        See TabularCellRange.to_numpy.
+        """
+        return self._to_numpy(dtype, masked)[0]
+
+    def from_numpy(self, array):
+        """
+        Sets values in this cell range from a one dimensional NumPy array.
+
+        See TabularCellRange.from_numpy.
+        """
+        if array.ndim != 1:
+            raise ValueError('One dimensional array is required.')
+        self._from_numpy(array.reshape(1, -1))
+
 
 class VerticalCellRange(CellRange):
     """
@@ -1481,7 +2596,7 @@ class VerticalCellRange(CellRange):
 
         This is much more effective than reading cell values one by one.
         """
-        array = self._get_target().getDataArray()
+        array = self._get_data_array()
         return tuple(itertools.chain.from_iterable(array))
     def __set_values(self, values):
         """
@@ -1490,7 +2605,7 @@ class VerticalCellRange(CellRange):
         This is much more effective than writing cell values one by one.
         """
         array = tuple((self._clean_value(v),) for v in values)
-        self._get_target().setDataArray(array)
+        self._set_array(array)
     values = property(__get_values, __set_values)
 
     def __get_formulas(self):
@@ -1500,7 +2615,7 @@ class VerticalCellRange(CellRange):
         If cells contain actual formulas then the returned values start
         with an equal sign  but all values are returned.
         """
-        array = self._get_target().getFormulaArray()
+        array = self._get_formula_array()
         return tuple(itertools.chain.from_iterable(array))
     def __set_formulas(self, formulas):
         """
@@ -1510,9 +2625,47 @@ class VerticalCellRange(CellRange):
         start with an equal sign.
         """
         array = tuple((self._clean_formula(v),) for v in formulas)
-        self._get_target().setFormulaArray(array)
+        self._set_array(array, formulas=True)
     formulas = property(__get_formulas, __set_formulas)
 
+    def update_values(self, values):
+        """
+        Sets values from an iterable only to changed cells.
+
+        Returns number of written cells, see TabularCellRange.update_values.
+        """
+        array = tuple((self._clean_value(v),) for v in values)
+        return self._update_array(array)
+
+    def to_numpy(self, dtype=float, masked=False):
+        """
+        Returns values in this cell range as a one dimensional NumPy array.
+
+        See TabularCellRange.to_numpy.
+        """
+        return self._to_numpy(dtype, masked)[:, 0]
+
+    def from_numpy(self, array):
+        """
+        Sets values in this cell range from a one dimensional NumPy array.
+
+        See TabularCellRange.from_numpy.
+        """
+        if array.ndim != 1:
+            raise ValueError('One dimensional array is required.')
+        self._from_numpy(array.reshape(-1, 1))
+
+    def iter_values(self, chunk_rows=_CHUNK_ROWS, formulas=False):
+        """
+        Iterates over values (or formulas) in this range.
+
+        Values are read lazily in chunks of chunk_rows cells, so even large
+        ranges can be processed with limited memory.
+        """
+        for array in self._iter_arrays(chunk_rows, formulas):
+            for row in array:
+                yield row[0]
+
 
 @str_repr
 class Sheet(TabularCellRange):
@@ -1527,11 +2680,13 @@ class Sheet(TabularCellRange):
 
     """
 
-    __slots__ = ('document', '_target', 'cursor')
+    __slots__ = ('document', '_target', 'cursor', '_batch', '_snapshot')
 
     def __init__(self, document, target):
         self.document = document # Parent SpreadsheetDocument.
         self._target = target # UNO com.sun.star.sheet.XSpreadsheet
+        self._batch = None # _WriteBuffer if batch is active.
+        self._snapshot = None # _Snapshot if snapshot mode is active.
         # This cursor will be used for most of the operation in this sheet.
         self.cursor = SheetCursor(target.createCursor())
         # Determine size of this sheet using the created cursor.
@@ -1567,10 +2722,221 @@ class Sheet(TabularCellRange):
         target = self._target.getCharts()
         return ChartCollection(self, target)
 
+    @property
+    def used_range(self):
+        """
+        Range of cells from the first to the last used cell.
+        """
+        return TabularCellRange(self, self._get_used_address())
 
-class SpreadsheetCollection(NamedCollection):
-    """
-    Collection of spreadsheets in a spreadsheet document.
+    @contextlib.contextmanager
+    def batch(self):
+        """
+        Context manager which buffers writes to cells of this sheet.
+
+        Values and formulas set to cells and small ranges of this sheet
+        object are buffered and sent on exit as few rectangular blocks
+        as possible, so writing cell by cell is as fast as bulk writes.
+        Any other operation (e.g. a read) sends buffered writes first.
+        """
+        if self._batch is not None:
+            # Nested batch is a part of the outer one.
+            yield self
+            return
+        self._batch = _WriteBuffer()
+        try:
+            yield self
+        finally:
+            try:
+                self._flush()
+            finally:
+                self._batch = None
+
+    @contextlib.contextmanager
+    def snapshot(self, listen=False):
+        """
+        Context manager which serves reads from a snapshot of this sheet.
+
+        The used area of the sheet is read at once when a value is
+        needed and values and formulas of cells and ranges of this sheet
+        object are then returned from memory. Writes done using this
+        sheet object drop the snapshot, so the used area is read again
+        by the next read.
+
+        Changes done by other means (e.g. by other clients or macros)
+        are not visible until refresh() is called. If listen is True
+        then a modify listener drops the snapshot on any change.
+        """
+        if self._snapshot is not None:
+            yield self
+            return
+        snapshot = self._snapshot = _Snapshot(self)
+        if listen:
+            snapshot.listener = _create_modify_listener(snapshot.clear)
+            self._target.addModifyListener(snapshot.listener)
+        try:
+            yield self
+        finally:
+            self._snapshot = None
+            if snapshot.listener is not None:
+                self._target.removeModifyListener(snapshot.listener)
+
+    def refresh(self):
+        """
+        Drops snapshot of this sheet so current values are read again.
+        """
+        self._invalidate()
+
+    def write_cells(self, cells):
+        """
+        Writes values of scattered cells given as {(row, col): value}.
+
+        Adjacent cells are written together as rectangular blocks. If the
+        cells are dense enough and all the values are numbers then the
+        whole block containing them can be read and written back at once
+        instead. This is done only if the block contains no text values
+        which could be changed by writing them back as formulas.
+        """
+        cells = dict((key, self._clean_value(value)) for key, value in cells.items())
+        if not cells:
+            return
+        self._invalidate()
+        blocks = _coalesce_cells(cells)
+        rows = [row for row, col in cells]
+        cols = [col for row, col in cells]
+        bounds = SheetAddress(min(rows), min(cols), max(rows) - min(rows) + 1,
+                              max(cols) - min(cols) + 1)
+        # Bounding block is read twice (values and formulas) and written once.
+        bounds_cost = 3 * (_CALL_COST + bounds.row_count * bounds.col_count)
+        blocks_cost = len(blocks) * _CALL_COST + len(cells)
+        if bounds_cost < blocks_cost and all(_is_finite_number(v) for v in cells.values()):
+            if self._rewrite_cells(bounds, cells):
+                return
+        for address, values in blocks:
+            self._get_target(address).setDataArray(values)
+
+    def write_dataframe(self, df, at=(0, 0), index=False, header=True,
+                        chunk_rows=_CHUNK_ROWS):
+        """
+        Writes a pandas DataFrame to this sheet.
+
+        The data frame is written with its top left corner at the given
+        (row, column) position. Column names are written to the first
+        row if header is True, the index is written as the first column
+        if index is True.
+
+        Values are converted by whole columns (dates, NaN values) and
+        written in chunks of chunk_rows rows. Returns the written range.
+        """
+        if index:
+            df = df.reset_index()
+        columns = [self._convert_series(df[name]) for name in df.columns]
+        row, col = at
+        row_count, col_count = len(df) + (1 if header else 0), len(columns)
+        if not col_count:
+            raise ValueError('Data frame has no columns.')
+        self._invalidate()
+        if header:
+            names = tuple(text_type(name) for name in df.columns)
+            self._get_target(SheetAddress(row, col, 1, col_count)).setDataArray((names,))
+            row += 1
+        for start in range(0, len(df), chunk_rows):
+            chunk = tuple(zip(*(column[start:start + chunk_rows] for column in columns)))
+            target = self._get_target(SheetAddress(row + start, col, len(chunk), col_count))
+            target.setDataArray(chunk)
+        return TabularCellRange(self, SheetAddress(at[0], at[1], row_count, col_count))
+
+    def _convert_series(self, series):
+        """
+        Converts a pandas Series to a list of values for UNO.
+        """
+        values = _numpy_to_uno(series.to_numpy(), self.document)
+        if values is not None:
+            return values.tolist()
+        # Object and extension types are converted value by value.
+        missing = series.isna().tolist()
+        return [u'' if m else self._clean_value(v) for v, m in zip(series.tolist(), missing)]
+
+    # Internal:
+
+    def _flush(self):
+        """
+        Sends buffered writes of the active batch.
+        """
+        batch = self._batch
+        buffered = (batch.data, False), (batch.formulas, True)
+        batch.data, batch.formulas = {}, {}
+        for cells, formulas in buffered:
+            for address, array in _coalesce_cells(cells):
+                target = self.cursor.get_target(address.row, address.col,
+                                                address.row_count, address.col_count)
+                if formulas:
+                    target.setFormulaArray(array)
+                else:
+                    target.setDataArray(array)
+
+    def _rewrite_cells(self, address, cells):
+        """
+        Writes numbers to cells by rewriting the whole block at once.
+
+        Formulas of other cells in the block are written back unchanged.
+        Returns False if the block contains text values or array formulas.
+        """
+        target = self._get_target(address)
+        values = target.getDataArray()
+        formulas = [list(row) for row in target.getFormulaArray()]
+        for i, row in enumerate(formulas):
+            for j, formula in enumerate(row):
+                key = address.row + i, address.col + j
+                if formula.startswith('{'):
+                    # Array formula (possibly reaching outside of the block)
+                    # would be replaced by text.
+                    return False
+                if key in cells:
+                    row[j] = repr(float(cells[key]))
+                elif values[i][j].__class__ is not float and values[i][j] != '' \
+                        and not formula.startswith('='):
+                    # Text could be converted to a number or a formula.
+                    return False
+        target.setFormulaArray(tuple(tuple(row) for row in formulas))
+        return True
+
+    def _invalidate(self):
+        """
+        Drops snapshot of this sheet if the snapshot mode is active.
+        """
+        if self._snapshot is not None:
+            self._snapshot.clear()
+
+    def _sync(self):
+        """
+        Prepares this sheet for a change done by the office.
+
+        Buffered writes are sent and the snapshot is dropped.
+        """
+        if self._batch:
+            self._flush()
+        self._invalidate()
+
+    def _get_used_address(self):
+        if self._snapshot is not None:
+            return self._snapshot.load()[0]
+        return self._read_used_address()
+
+    def _read_used_address(self):
+        if self._batch:
+            self._flush()
+        # A new cursor is used because the shared one tracks its position.
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/sheet/XUsedAreaCursor.html
+        cursor = self._target.createCursor()
+        cursor.gotoStartOfUsedArea(False)
+        cursor.gotoEndOfUsedArea(True)
+        return SheetAddress._from_uno(cursor.getRangeAddress())
+
+
+class SpreadsheetCollection(NamedCollection):
+    """
+    Collection of spreadsheets in a spreadsheet document.
 
     Instance of this class is returned via sheets property of
     the SpreadsheetDocument class.
@@ -1612,6 +2978,20 @@ class SpreadsheetCollection(NamedCollection):
         self._copy(old_name, new_name, index)
         return self[new_name]
 
+    def import_from(self, document, name, index=None):
+        """
+        Imports a sheet with the given name from another document.
+
+        The sheet is copied by the office including formats and formulas
+        without reading its cells. If an optional index argument is not
+        provided then the sheet is appended at the end. Returns the new
+        sheet.
+        """
+        if index is None:
+            index = len(self)
+        index = self._import(document, name, index)
+        return self[index]
+
     # Internal:
 
     def _factory(self, target):
@@ -1625,10 +3005,19 @@ class SpreadsheetCollection(NamedCollection):
         # http://www.openoffice.org/api/docs/common/ref/com/sun/star/sheet/XSpreadsheets.html#copyByName
         self._target.copyByName(old_name, new_name, index)
 
+    def _import(self, document, name, index):
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/sheet/XSpreadsheets2.html#importSheet
+        try:
+            return self._target.importSheet(document._target, name, index)
+        except _uno.IllegalArgumentException:
+            raise KeyError(name)
+        except _uno.IndexOutOfBoundsException:
+            raise IndexError(index)
+
     def _delete(self, name):
         try:
             self._target.removeByName(name)
-        except _NoSuchElementException:
+        except _uno.NoSuchElementException:
             raise KeyError(name)
 
 
@@ -1662,11 +3051,17 @@ class SpreadsheetDocument(_UnoProxy):
     Spreadsheet document.
     """
 
+    def __init__(self, target, desktop=None):
+        self.desktop = desktop # Desktop which opened this document or None
+        super(SpreadsheetDocument, self).__init__(target)
+
     def save(self, path=None, filter_name=None):
         """
         Saves this document to a local file system.
 
         The optional first argument defaults to the document's path.
+        It can be also a file-like object (with a write method), then
+        the document is written to it without using the file system.
 
         Accept optional second  argument which defines type of
         the saved file. Use one of FILTER_* constants or see list of
@@ -1676,26 +3071,40 @@ class SpreadsheetDocument(_UnoProxy):
 
         if path is None:
             try:
-                self._target.store()
-            except _IOException as e:
+                with _deadline(self.desktop, 'store'):
+                    self._target.store()
+            except _uno.IOException as e:
                 raise IOError(e.Message)
             return
 
-        # UNO requires absolute paths
-        url = uno.systemPathToFileUrl(os.path.abspath(path))
-        if filter_name:
-            format_filter = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-            format_filter.Name = 'FilterName'
-            format_filter.Value = filter_name
-            filters = (format_filter,)
+        if hasattr(path, 'write'):
+            # http://www.openoffice.org/api/docs/common/ref/com/sun/star/document/MediaDescriptor.html#OutputStream
+            url = 'private:stream'
+            # Streams have no file type, native format is used by default.
+            filters = (_property_value('FilterName', filter_name or 'calc8'),
+                       _property_value('OutputStream', _create_output_stream(path)))
         else:
-            filters = ()
+            # UNO requires absolute paths
+            url = uno.systemPathToFileUrl(os.path.abspath(path))
+            if filter_name:
+                filters = (_property_value('FilterName', filter_name),)
+            else:
+                filters = ()
         # http://www.openoffice.org/api/docs/common/ref/com/sun/star/frame/XStorable.html#storeToURL
         try:
-            self._target.storeToURL(url, filters)
-        except _IOException as e:
+            with _deadline(self.desktop, 'storeToURL'):
+                self._target.storeToURL(url, filters)
+        except _uno.IOException as e:
             raise IOError(e.Message)
 
+    def to_bytes(self, filter_name=None):
+        """
+        Returns content of this document saved using the given filter.
+        """
+        output = io.BytesIO()
+        self.save(output, filter_name)
+        return output.getvalue()
+
     def close(self):
         """
         Closes this document.
@@ -1788,6 +3197,189 @@ class SpreadsheetDocument(_UnoProxy):
         return self.__null_date
 
 
+class _Watch(object):
+    """
+    One deadline registered in a Watchdog.
+    """
+
+    __slots__ = ('deadline', 'callback', 'expired')
+
+    def __init__(self, deadline, callback):
+        self.deadline = deadline
+        self.callback = callback
+        self.expired = False
+
+
+class Watchdog(object):
+    """
+    Calls a callback when a watched operation exceeds its deadline.
+
+    One background thread watches all the registered deadlines:
+
+        >>> with watchdog.watch(60, process.kill) as watch:
+        ...     do_something()
+        >>> watch.expired
+        False
+
+    """
+
+    def __init__(self):
+        self._watches = set()
+        self._condition = threading.Condition()
+        self._thread = None
+
+    @contextlib.contextmanager
+    def watch(self, timeout, callback):
+        """
+        Calls the callback if the block runs longer than timeout seconds.
+        """
+        watch = _Watch(time.time() + timeout, callback)
+        with self._condition:
+            self._watches.add(watch)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='pyoo-watchdog')
+                self._thread.daemon = True
+                self._thread.start()
+            self._condition.notify()
+        try:
+            yield watch
+        finally:
+            with self._condition:
+                self._watches.discard(watch)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                now = time.time()
+                expired = [w for w in self._watches if w.deadline <= now]
+                for watch in expired:
+                    watch.expired = True
+                    self._watches.discard(watch)
+                if not expired:
+                    if self._watches:
+                        timeout = min(w.deadline for w in self._watches) - now
+                        self._condition.wait(timeout)
+                    else:
+                        self._condition.wait()
+                    continue
+            for watch in expired:
+                watch.callback()
+
+
+_watchdog = Watchdog()
+
+
+@contextlib.contextmanager
+def _deadline(desktop, operation):
+    """
+    Guards a blocking UNO call by a deadline of the desktop.
+
+    When the deadline is exceeded then the office program is killed,
+    which interrupts the call, and OfficeTimeoutError is raised after
+    the program is restarted. Concurrent calls time out together, the
+    program is restarted only by the first of them.
+    """
+    if desktop is None or desktop.timeout is None or desktop.process is None:
+        yield
+        return
+    process = desktop.process
+    pid = process.pid
+
+    def kill():
+        # Program could be already restarted by another timed out call.
+        if process.pid == pid:
+            process._timed_out = pid
+            process.kill()
+
+    timed_out = False
+    with _watchdog.watch(desktop.timeout, kill) as watch:
+        try:
+            yield
+        except Exception:
+            # Call also fails when a deadline of another call killed the program.
+            timed_out = watch.expired or (pid is not None and process._timed_out == pid)
+            if not timed_out:
+                raise
+    if timed_out or watch.expired:
+        with process._lock:
+            if process.pid == pid:
+                process.restart()
+        raise OfficeTimeoutError('%s timed out after %s seconds.'
+                                 % (operation, desktop.timeout))
+
+
+def _property_value(name, value):
+    """
+    Creates a PropertyValue struct used in media descriptors.
+    """
+    pv = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
+    pv.Name = name
+    pv.Value = value
+    return pv
+
+
+# Class implementing XOutputStream, created when first needed because
+# it requires an import of UNO interfaces.
+_output_stream_class = None
+
+def _create_output_stream(fileobj):
+    """
+    Creates an UNO output stream writing to a file-like object.
+    """
+    global _output_stream_class
+    if _output_stream_class is None:
+        import unohelper
+        from com.sun.star.io import XOutputStream
+
+        class OutputStream(unohelper.Base, XOutputStream):
+            # http://www.openoffice.org/api/docs/common/ref/com/sun/star/io/XOutputStream.html
+
+            def __init__(self, fileobj):
+                self.fileobj = fileobj
+
+            def writeBytes(self, data):
+                self.fileobj.write(data.value)
+
+            def flush(self):
+                if hasattr(self.fileobj, 'flush'):
+                    self.fileobj.flush()
+
+            def closeOutput(self):
+                # The file-like object is owned by the caller.
+                pass
+
+        _output_stream_class = OutputStream
+    return _output_stream_class(fileobj)
+
+
+# Class implementing XModifyListener, created when first needed.
+_modify_listener_class = None
+
+def _create_modify_listener(callback):
+    """
+    Creates an UNO modify listener calling the callback on any change.
+    """
+    global _modify_listener_class
+    if _modify_listener_class is None:
+        import unohelper
+        from com.sun.star.util import XModifyListener
+
+        class ModifyListener(unohelper.Base, XModifyListener):
+            # http://www.openoffice.org/api/docs/common/ref/com/sun/star/util/XModifyListener.html
+
+            def __init__(self, callback):
+                self.callback = callback
+
+            def modified(self, event):
+                self.callback()
+
+            def disposing(self, event):
+                pass
+
+        _modify_listener_class = ModifyListener
+    return _modify_listener_class(callback)
+
+
 def _get_connection_url(hostname, port, pipe=None):
     if pipe:
         conn = 'pipe,name=%s' % pipe
@@ -1798,7 +3390,7 @@ def _get_connection_url(hostname, port, pipe=None):
 def _get_remote_context(resolver, url):
     try:
         return resolver.resolve(url)
-    except _NoConnectException:
+    except _uno.NoConnectException:
         raise IOError(resolver, url)
 
 class Desktop(_UnoProxy):
@@ -1813,42 +3405,116 @@ class Desktop(_UnoProxy):
 
     """
 
-    def __init__(self, hostname='localhost', port=2002, pipe=None):
+    def __init__(self, hostname='localhost', port=2002, pipe=None, load_options=None):
         url = _get_connection_url(hostname, port, pipe)
         self.local_context = uno.getComponentContext()
         resolver = self.local_context.getServiceManager().createInstanceWithContext('com.sun.star.bridge.UnoUrlResolver', self.local_context)
         self.remote_context = _get_remote_context(resolver, url)
         desktop = self.remote_context.getServiceManager().createInstanceWithContext('com.sun.star.frame.Desktop', self.remote_context)
+        # Number of documents created or opened using this connection.
+        self.document_count = 0
+        # Deadline of document loading and saving (in seconds), only
+        # supported for desktops of managed OfficeProcess instances.
+        self.timeout = None
+        self.process = None
+        # Default options of create_spreadsheet and open_spreadsheet.
+        self.load_options = dict(load_options or {})
         super(Desktop, self).__init__(desktop)
 
-    def create_spreadsheet(self):
+    def create_spreadsheet(self, **options):
         """
         Creates a new spreadsheet document.
+
+        Accepts hidden and macros options, see open_spreadsheet.
         """
         url = 'private:factory/scalc'
-        document = self._open_url(url)
-        return SpreadsheetDocument(document)
+        extra = self._get_load_options(options, ('hidden', 'macros'))
+        document = self._open_url(url, extra)
+        return SpreadsheetDocument(document, self)
 
-    def open_spreadsheet(self, path, as_template=False):
+    def open_spreadsheet(self, path, as_template=False, **options):
         """
         Opens an exiting spreadsheet document on the local file system.
+
+        A file-like object (with a read method) can be given instead
+        of a path, e.g. io.BytesIO with content of the document. Then
+        the file system is not used at all.
+
+        Following options can speed up loading of documents which
+        are processed without user interaction:
+
+          * hidden -- no window (frame) is displayed,
+          * read_only -- document is read-only and no lock file is created,
+          * macros -- macros are not executed if False,
+          * update_links -- links to other documents are not updated if False.
+
+        Default values are taken from the load_options attribute, all
+        of the options are set by LOAD_OPTIONS_BATCH.
         """
-        extra = ()
+        extra = self._get_load_options(options, ('hidden', 'read_only', 'macros', 'update_links'))
         if as_template:
-            pv = uno.createUnoStruct('com.sun.star.beans.PropertyValue')
-            pv.Name = 'AsTemplate'
-            pv.Value = True
-            extra += (pv,)
-        # UNO requires absolute paths
-        url = uno.systemPathToFileUrl(os.path.abspath(path))
+            extra += (_property_value('AsTemplate', True),)
+        if hasattr(path, 'read'):
+            # http://www.openoffice.org/api/docs/common/ref/com/sun/star/document/MediaDescriptor.html#InputStream
+            url = 'private:stream'
+            extra += (_property_value('InputStream', self._create_input_stream(path.read())),)
+        else:
+            # UNO requires absolute paths
+            url = uno.systemPathToFileUrl(os.path.abspath(path))
         document = self._open_url(url, extra)
-        return SpreadsheetDocument(document)
+        return SpreadsheetDocument(document, self)
+
+    def is_alive(self):
+        """
+        Returns whether the connection to the office program still works.
+        """
+        try:
+            # Any cheap call is sufficient, the bridge raises an exception
+            # when the remote program is gone.
+            self._target.getFrames()
+        except (_uno.RuntimeException, _uno.DisposedException):
+            return False
+        return True
+
+    def _get_load_options(self, options, names):
+        """
+        Converts load options to a media descriptor.
+        """
+        for name in options:
+            if name not in names:
+                raise TypeError('Unknown load option: %r.' % name)
+        merged = dict((k, v) for k, v in self.load_options.items() if k in names)
+        merged.update(options)
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/document/MediaDescriptor.html
+        extra = ()
+        if merged.get('hidden'):
+            extra += (_property_value('Hidden', True),)
+        if merged.get('read_only'):
+            extra += (_property_value('ReadOnly', True),)
+        if merged.get('macros') is False:
+            mode = uno.getConstantByName('com.sun.star.document.MacroExecMode.NEVER_EXECUTE')
+            extra += (_property_value('MacroExecutionMode', mode),)
+        if merged.get('update_links') is False:
+            mode = uno.getConstantByName('com.sun.star.document.UpdateDocMode.NO_UPDATE')
+            extra += (_property_value('UpdateDocMode', mode),)
+        return extra
+
+    def _create_input_stream(self, data):
+        # http://www.openoffice.org/api/docs/common/ref/com/sun/star/io/SequenceInputStream.html
+        # Input stream created in the office program is seekable, which is
+        # required by zip based formats, and it can be read without callbacks.
+        manager = self.remote_context.getServiceManager()
+        return manager.createInstanceWithArgumentsAndContext(
+            'com.sun.star.io.SequenceInputStream', (uno.ByteSequence(data),),
+            self.remote_context)
 
     def _open_url(self, url, extra=()):
         # http://www.openoffice.org/api/docs/common/ref/com/sun/star/frame/XComponentLoader.html#loadComponentFromURL
+        self.document_count += 1
         try:
-            return self._target.loadComponentFromURL(url, '_blank', 0, extra)
-        except _IOException as e:
+            with _deadline(self, 'loadComponentFromURL'):
+                return self._target.loadComponentFromURL(url, '_blank', 0, extra)
+        except _uno.IOException as e:
             raise IOError(e.Message)
 
 
@@ -1861,28 +3527,995 @@ class LazyDesktop(object):
     is that a LazyDesktop instance can recover from a restart of
     the OpenOffice.org program.
 
+    The connection is created on first use and then cached. If the bridge
+    is disposed (e.g. the program was restarted) then the connection
+    is re-created. Connection attempts are retried up to `retries` times,
+    waiting `backoff` seconds before the first retry and twice as long
+    before every next one.
+
     """
 
     cls = Desktop
 
-    def __init__(self, hostname='localhost', port=2002, pipe=None):
+    def __init__(self, hostname='localhost', port=2002, pipe=None,
+                 retries=3, backoff=0.1):
         self.hostname = hostname
         self.port = port
         self.pipe = pipe
+        self.retries = retries
+        self.backoff = backoff
+        self._desktop = None
+        self._lock = threading.Lock()
 
-    def create_spreadsheet(self):
+    @property
+    def desktop(self):
+        """
+        Cached Desktop instance, connection is created if necessary.
+        """
+        return self._connect()
+
+    def create_spreadsheet(self, **options):
         """
         Creates a new spreadsheet document.
         """
-        desktop = self.cls(self.hostname, self.port, self.pipe)
-        return desktop.create_spreadsheet()
+        return self._call('create_spreadsheet', **options)
 
-    def open_spreadsheet(self, path, as_template=False):
+    def open_spreadsheet(self, path, as_template=False, **options):
         """
         Opens an exiting spreadsheet document on the local file system.
         """
-        desktop = self.cls(self.hostname, self.port)
-        return desktop.open_spreadsheet(path, as_template=as_template)
+        if hasattr(path, 'read'):
+            # Stream is read once, so a retry after reconnection gets the same data.
+            data = path.read()
+            return self._retry(lambda desktop: desktop.open_spreadsheet(
+                io.BytesIO(data), as_template=as_template, **options))
+        return self._call('open_spreadsheet', path, as_template=as_template, **options)
+
+    # Internal:
+
+    def _connect(self):
+        with self._lock:
+            desktop = self._desktop
+            if desktop is None:
+                desktop = self._desktop = self.cls(self.hostname, self.port, self.pipe)
+            return desktop
+
+    def _disconnect(self, desktop):
+        with self._lock:
+            if self._desktop is desktop:
+                self._desktop = None
+
+    def _call(self, name, *args, **kwargs):
+        """
+        Calls the named Desktop method, reconnects if the bridge is lost.
+        """
+        return self._retry(lambda desktop: getattr(desktop, name)(*args, **kwargs))
+
+    def _retry(self, func):
+        """
+        Calls the function with a Desktop, reconnects if the bridge is lost.
+        """
+        delay = self.backoff
+        for attempt in itertools.count():
+            desktop = None
+            try:
+                desktop = self._connect()
+                return func(desktop)
+            except (IOError, _uno.RuntimeException, _uno.DisposedException) as e:
+                if desktop is not None:
+                    # Errors of a working connection are not ours to handle.
+                    if not isinstance(e, _uno.DisposedException) and desktop.is_alive():
+                        raise
+                    self._disconnect(desktop)
+                if attempt >= self.retries:
+                    raise
+            time.sleep(delay)
+            delay *= 2
+
+
+def _get_free_port(hostname):
+    """
+    Returns a TCP port which is not used now.
+    """
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    try:
+        sock.bind((hostname, 0))
+        return sock.getsockname()[1]
+    finally:
+        sock.close()
+
+
+def _get_children(pid):
+    """
+    Returns IDs of child processes, empty list if /proc is not available.
+    """
+    children = []
+    try:
+        names = os.listdir('/proc')
+    except OSError:
+        return children
+    for name in names:
+        if not name.isdigit():
+            continue
+        try:
+            with open('/proc/%s/stat' % name) as f:
+                # Process name in the second field can contain spaces.
+                ppid = int(f.read().rsplit(')', 1)[1].split()[1])
+        except (IOError, OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(name))
+    return children
+
+
+def _get_memory(pids):
+    """
+    Returns resident memory (in bytes) of processes with given IDs.
+
+    Returns None if the /proc file system is not available or the first
+    process does not exist.
+    """
+    total = 0
+    for pid in pids:
+        try:
+            with open('/proc/%d/status' % pid) as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+                        break
+        except (IOError, OSError):
+            if pid == pids[0]:
+                return None
+    return total
+
+
+class RecyclePolicy(object):
+    """
+    Decides when an office program should be restarted.
+
+    Long running office programs grow in memory and slow down. A program
+    is recycled after `max_documents` documents were created or opened,
+    when its resident memory exceeds `max_memory` bytes or when it runs
+    for more than `max_age` seconds. Unset limits are not checked.
+
+    """
+
+    __slots__ = ('max_documents', 'max_memory', 'max_age')
+
+    def __init__(self, max_documents=None, max_memory=None, max_age=None):
+        self.max_documents = max_documents
+        self.max_memory = max_memory
+        self.max_age = max_age
+
+    def __call__(self, process):
+        """
+        Returns whether the given OfficeProcess should be recycled.
+        """
+        if self.max_documents is not None and process.document_count >= self.max_documents:
+            return True
+        if self.max_age is not None and process.age >= self.max_age:
+            return True
+        if self.max_memory is not None:
+            # Reading memory usage is the most expensive check.
+            memory = process.memory
+            if memory is not None and memory >= self.max_memory:
+                return True
+        return False
+
+
+class OfficeProcess(object):
+    """
+    Headless OpenOffice.org program managed by this library.
+
+    Starts the office binary in a headless mode with a private user
+    profile, so multiple programs can run side by side. If neither pipe
+    nor port is given then a unique pipe name is generated, port 0 selects
+    a free TCP port.
+
+        >>> with OfficeProcess() as process:
+        ...     doc = process.desktop.create_spreadsheet()
+
+    The start method waits until the program accepts connections
+    (at most `timeout` seconds) and then opens a warm-up document so
+    the first real document does not have to wait for Calc to load.
+    The `warm_up` argument can be False (no warm-up), True (a new empty
+    spreadsheet) or a path of a document to be opened.
+
+    Managed programs do not create lock files of opened documents
+    unless `file_locking` is True.
+
+    If `operation_timeout` is set then loading and saving of documents
+    is watched. When an operation exceeds the timeout then the program is
+    killed and restarted and the operation raises OfficeTimeoutError.
+
+    """
+
+    binary = 'soffice'
+
+    # Minimal number of seconds between two readings of memory usage.
+    memory_interval = 5
+
+    # Delay between connection attempts while the program is starting.
+    poll_interval = 0.1
+
+    def __init__(self, binary=None, pipe=None, port=None, hostname='localhost',
+                 timeout=60, warm_up=True, args=(), operation_timeout=None,
+                 file_locking=False):
+        if binary is not None:
+            self.binary = binary
+        self.pipe = pipe
+        self.port = port
+        self.hostname = hostname
+        self.timeout = timeout
+        self.warm_up = warm_up
+        self.args = tuple(args)
+        self.operation_timeout = operation_timeout
+        self.file_locking = file_locking
+        self._process = None
+        self._profile = None
+        self._desktop = None
+        self._started = None
+        self._children = None # Cached IDs of child processes.
+        self._memory = None # Last (time, memory) reading.
+        self._timed_out = None # ID of a process killed by an operation deadline.
+        # Serializes starting and stopping of the program by multiple threads.
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    @property
+    def pid(self):
+        """
+        Process ID of the running program or None.
+        """
+        return self._process.pid if self._process is not None else None
+
+    @property
+    def running(self):
+        """
+        Whether the program is running.
+        """
+        return self._process is not None and self._process.poll() is None
+
+    @property
+    def age(self):
+        """
+        Number of seconds since the program was started.
+        """
+        return time.time() - self._started if self._started is not None else 0
+
+    @property
+    def memory(self):
+        """
+        Resident memory of the running program (in bytes) or None.
+
+        The value is read at most once per memory_interval seconds.
+        """
+        if not self.running:
+            return None
+        now = time.time()
+        reading = self._memory
+        if reading is not None and now - reading[0] < self.memory_interval:
+            return reading[1]
+        # The soffice binary is often only a launcher of the soffice.bin child.
+        memory = _get_memory([self._process.pid] + self._get_children())
+        self._memory = now, memory
+        return memory
+
+    @property
+    def document_count(self):
+        """
+        Number of documents created or opened since the program was started.
+
+        Warm-up document is not counted.
+        """
+        return self._desktop.document_count if self._desktop is not None else 0
+
+    @property
+    def desktop(self):
+        """
+        Desktop connected to this program, the program is started if necessary.
+        """
+        with self._lock:
+            if self._desktop is None:
+                self.start()
+            return self._desktop
+
+    def connect(self):
+        """
+        Returns a working Desktop, restarts the program if it is not alive.
+        """
+        with self._lock:
+            desktop = self._desktop
+            if desktop is not None and self.running and desktop.is_alive():
+                return desktop
+            self.restart()
+            return self._desktop
+
+    def start(self):
+        """
+        Starts the program and waits until it is ready.
+        """
+        with self._lock:
+            if self._process is not None:
+                raise RuntimeError('Office program is already started.')
+            if self.pipe is None and self.port is None:
+                self.pipe = 'pyoo_%d_%x' % (os.getpid(), random.getrandbits(64))
+            if self.port == 0:
+                self.port = _get_free_port(self.hostname)
+            self._profile = tempfile.mkdtemp(prefix='pyoo_')
+            try:
+                env = dict(os.environ)
+                if not self.file_locking:
+                    # Lock files of opened documents are not created.
+                    env['SAL_ENABLE_FILE_LOCKING'] = '0'
+                with open(os.devnull, 'w') as devnull:
+                    self._process = subprocess.Popen(self._get_command(), stdin=devnull,
+                                                     stdout=devnull, stderr=devnull, env=env)
+                self._started = time.time()
+                self._desktop = self._wait_for_desktop()
+                self._warm_up()
+                self._desktop.timeout = self.operation_timeout
+                self._desktop.process = self
+            except Exception:
+                self.stop()
+                raise
+
+    def stop(self):
+        """
+        Terminates the program and removes its user profile.
+        """
+        with self._lock:
+            desktop, process, children = self._desktop, self._process, self._children
+            self._desktop = self._process = self._started = None
+            self._children = self._memory = None
+            if desktop is not None:
+                try:
+                    # http://www.openoffice.org/api/docs/common/ref/com/sun/star/frame/XDesktop.html#terminate
+                    desktop._target.terminate()
+                except (_uno.Exception, _uno.RuntimeException, _uno.DisposedException):
+                    # Bridge is disposed when the program exits.
+                    pass
+            if process is not None:
+                if not self._wait(process, self.timeout):
+                    if children is None:
+                        children = _get_children(process.pid)
+                    self._kill(process, children)
+                    process.wait()
+            if self._profile is not None:
+                shutil.rmtree(self._profile, ignore_errors=True)
+                self._profile = None
+
+    def kill(self):
+        """
+        Kills the running program immediately.
+
+        Pending UNO calls fail and the program can be started again
+        by the restart method.
+        """
+        process = self._process
+        if process is None:
+            return
+        self._kill(process, self._get_children())
+
+    def restart(self):
+        """
+        Stops the program (if it is running) and starts it again.
+        """
+        with self._lock:
+            self.stop()
+            self.start()
+
+    # Internal:
+
+    def _get_children(self):
+        """
+        Returns IDs of child processes of the running program.
+
+        Scanning of all processes is slow, so children are found once.
+        """
+        if self._children is None:
+            self._children = _get_children(self._process.pid)
+        return self._children
+
+    def _kill(self, process, children):
+        """
+        Kills the process and its children (given by their IDs).
+        """
+        # Kill also soffice.bin started by the launcher.
+        for pid in children:
+            try:
+                os.kill(pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+            except OSError:
+                pass
+        try:
+            process.kill()
+        except OSError:
+            pass
+
+    def _get_command(self):
+        if self.pipe is not None:
+            accept = 'pipe,name=%s;urp;' % self.pipe
+        else:
+            accept = 'socket,host=%s,port=%d;urp;' % (self.hostname, self.port)
+        profile = uno.systemPathToFileUrl(self._profile)
+        return [
+            self.binary,
+            '--headless',
+            '--invisible',
+            '--nologo',
+            '--nodefault',
+            '--norestore',
+            '--nolockcheck',
+            '--accept=%s' % accept,
+            '-env:UserInstallation=%s' % profile,
+        ] + list(self.args)
+
+    def _wait_for_desktop(self):
+        deadline = time.time() + self.timeout
+        while True:
+            if self._process.poll() is not None:
+                raise IOError('Office program exited with code %d.'
+                              % self._process.returncode)
+            try:
+                return Desktop(self.hostname, self.port, self.pipe)
+            except (IOError, _uno.ConnectionSetupException):
+                if time.time() > deadline:
+                    raise IOError('Office program is not ready after %s seconds.'
+                                  % self.timeout)
+            time.sleep(self.poll_interval)
+
+    def _warm_up(self):
+        if not self.warm_up:
+            return
+        if self.warm_up is True:
+            document = self._desktop.create_spreadsheet()
+        else:
+            document = self._desktop.open_spreadsheet(self.warm_up)
+        document.close()
+        self._desktop.document_count = 0
+
+    def _wait(self, process, timeout):
+        """
+        Waits for the process to exit, returns False on timeout.
+        """
+        deadline = time.time() + timeout
+        while process.poll() is None:
+            if time.time() > deadline:
+                return False
+            time.sleep(self.poll_interval)
+        return True
+
+
+# Strategies used by DesktopPool for selection of a connection.
+POOL_ROUND_ROBIN = 'round_robin'
+POOL_LEAST_BUSY = 'least_busy'
+
+
+class _PoolEntry(object):
+    """
+    One connection managed by DesktopPool.
+    """
+
+    __slots__ = ('factory', 'process', 'desktop', 'busy', 'draining', 'lock')
+
+    def __init__(self, factory, process=None):
+        self.factory = factory
+        self.process = process # OfficeProcess or None
+        self.desktop = None
+        # Jobs sharing the entry connect (or restart the program) one by one.
+        self.lock = threading.Lock()
+        self.busy = 0
+        # Entry waits for running jobs to finish before it is recycled.
+        self.draining = False
+
+
+class DesktopPool(object):
+    """
+    Pool of connections to multiple running OpenOffice.org programs.
+
+    Each office program is practically single-threaded so concurrent jobs
+    should be spread over several programs (listening on different ports
+    or pipes). The pool hands out one Desktop instance per job:
+
+        >>> pool = DesktopPool.from_ports([2002, 2003])
+        >>> with pool.desktop() as desktop:
+        ...     doc = desktop.create_spreadsheet()
+
+    Connections are created lazily by the given factories (callables
+    which return a Desktop instance) and re-created if the health check
+    of a checked-out connection fails.
+
+    Optional max_jobs argument limits number of concurrent jobs per one
+    connection, checkout blocks until a connection is available.
+
+    Pools of OfficeProcess instances (see from_processes) can recycle
+    programs according to a RecyclePolicy. A program which should be
+    recycled gets no new jobs, it is restarted when its running jobs
+    are checked in and next jobs get a fresh Desktop.
+
+    """
+
+    def __init__(self, factories, strategy=POOL_ROUND_ROBIN, max_jobs=None,
+                 check_health=True, recycle=None):
+        if strategy not in (POOL_ROUND_ROBIN, POOL_LEAST_BUSY):
+            raise ValueError('Unknown pool strategy: %r.' % (strategy,))
+        self._entries = [self._create_entry(factory) for factory in factories]
+        if not self._entries:
+            raise ValueError('Desktop pool can not be empty.')
+        self.strategy = strategy
+        self.max_jobs = max_jobs
+        self.check_health = check_health
+        self.recycle = recycle
+        self._next = 0
+        # Checked out desktops: id(desktop) -> [entry, count]
+        self._leases = {}
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_ports(cls, ports, hostname='localhost', **kwargs):
+        """
+        Creates a pool of connections to programs listening on given ports.
+        """
+        factories = [functools.partial(Desktop, hostname, port) for port in ports]
+        return cls(factories, **kwargs)
+
+    @classmethod
+    def from_pipes(cls, pipes, **kwargs):
+        """
+        Creates a pool of connections to programs listening on named pipes.
+        """
+        factories = [functools.partial(Desktop, pipe=pipe) for pipe in pipes]
+        return cls(factories, **kwargs)
+
+    @classmethod
+    def from_processes(cls, processes, **kwargs):
+        """
+        Creates a pool of connections to managed OfficeProcess instances.
+
+        Programs are started lazily and restarted when they die.
+        """
+        return cls(processes, **kwargs)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def checkout(self):
+        """
+        Returns a Desktop instance which can be used for one job.
+
+        The desktop must be returned using the checkin method.
+        """
+        while True:
+            with self._condition:
+                entry = self._select()
+                while entry is None:
+                    self._condition.wait()
+                    entry = self._select()
+                entry.busy += 1
+                draining = entry.draining
+            # Recycle policy can read memory usage which is slow,
+            # so it is checked without blocking other threads.
+            if not draining and self._expired(entry):
+                with self._condition:
+                    entry.draining = draining = True
+                    if entry.busy > 1:
+                        # Let running jobs finish, try another entry.
+                        entry.busy -= 1
+                        self._condition.notify_all()
+                        continue
+            break
+        try:
+            if draining:
+                self._recycle(entry)
+            desktop = self._connect(entry)
+        except Exception:
+            with self._condition:
+                entry.busy -= 1
+                self._condition.notify_all()
+            raise
+        with self._condition:
+            lease = self._leases.setdefault(id(desktop), [entry, 0])
+            lease[1] += 1
+        return desktop
+
+    def checkin(self, desktop):
+        """
+        Returns a Desktop instance obtained by the checkout method.
+
+        If the office program should be recycled and this was its last
+        running job then the program is restarted by this call.
+        """
+        with self._condition:
+            try:
+                lease = self._leases[id(desktop)]
+            except KeyError:
+                raise ValueError('Desktop was not checked out from this pool.')
+            entry = lease[0]
+            lease[1] -= 1
+            if not lease[1]:
+                del self._leases[id(desktop)]
+        # The entry stays busy while the slow recycle policy is checked.
+        expired = not entry.draining and self._expired(entry)
+        with self._condition:
+            entry.busy -= 1
+            if expired:
+                entry.draining = True
+            recycle = entry.draining and not entry.busy
+            if recycle:
+                # Reserve the entry until it is recycled.
+                entry.busy += 1
+            else:
+                self._condition.notify_all()
+        if recycle:
+            try:
+                self._recycle(entry)
+            finally:
+                with self._condition:
+                    entry.busy -= 1
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def desktop(self):
+        """
+        Context manager which checks out a desktop and returns it back.
+        """
+        desktop = self.checkout()
+        try:
+            yield desktop
+        finally:
+            self.checkin(desktop)
+
+    # Internal:
+
+    def _create_entry(self, factory):
+        if isinstance(factory, OfficeProcess):
+            return _PoolEntry(factory.connect, factory)
+        return _PoolEntry(factory)
+
+    def _select(self):
+        """
+        Returns an entry for a next job or None if all entries are full.
+        """
+        entries = self._entries
+        available = [e for e in entries if self._is_available(e)]
+        if not available:
+            return None
+        if self.strategy == POOL_LEAST_BUSY:
+            return min(available, key=lambda e: e.busy)
+        # Round robin over all entries, skipping full ones.
+        count = len(entries)
+        for i in range(count):
+            entry = entries[(self._next + i) % count]
+            if self._is_available(entry):
+                self._next = (self._next + i + 1) % count
+                return entry
+
+    def _is_available(self, entry):
+        if entry.draining:
+            # Draining entry can be only recycled by the next job.
+            return not entry.busy
+        return self.max_jobs is None or entry.busy < self.max_jobs
+
+    def _expired(self, entry):
+        """
+        Returns whether the entry should be recycled.
+        """
+        if self.recycle is None or entry.process is None or entry.desktop is None:
+            return False
+        return self.recycle(entry.process)
+
+    def _recycle(self, entry):
+        """
+        Restarts the office program of the entry.
+        """
+        try:
+            with entry.lock:
+                entry.process.restart()
+                entry.desktop = entry.process.desktop
+        finally:
+            with self._condition:
+                entry.draining = False
+
+    def _connect(self, entry):
+        """
+        Returns a working desktop for the given entry.
+        """
+        with entry.lock:
+            desktop = entry.desktop
+            if desktop is not None and (not self.check_health or desktop.is_alive()):
+                return desktop
+            desktop = entry.factory()
+            entry.desktop = desktop
+            return desktop
+
+
+class ConversionResult(object):
+    """
+    Result of a conversion of one document by convert_many.
+
+    The error attribute contains an exception if the conversion failed.
+    """
+
+    __slots__ = ('input', 'output', 'error')
+
+    def __init__(self, input, output, error=None):
+        self.input = input
+        self.output = output
+        self.error = error
+
+    def __repr__(self):
+        return '<%s: %r -> %r%s>' % (self.__class__.__name__, self.input, self.output,
+                                     ' (%r)' % self.error if self.error else '')
+
+    @property
+    def ok(self):
+        """
+        Whether the document was converted successfully.
+        """
+        return self.error is None
+
+
+def _get_conversion_output(path, filter_name, output_dir):
+    """
+    Returns an output path for a converted document.
+    """
+    try:
+        extension = _FILTER_EXTENSIONS[filter_name]
+    except KeyError:
+        raise ValueError('Output path must be given for filter %r.' % filter_name)
+    directory, name = os.path.split(path)
+    name = os.path.splitext(name)[0] + extension
+    return os.path.join(output_dir if output_dir is not None else directory, name)
+
+
+def _convert(pool, input, output, filter_name):
+    with pool.desktop() as desktop:
+        document = desktop.open_spreadsheet(input, **LOAD_OPTIONS_BATCH)
+        try:
+            document.save(output, filter_name)
+        finally:
+            document.close()
+
+
+def convert_many(inputs, filter_name, pool=None, workers=None, output_dir=None):
+    """
+    Converts many documents in parallel using multiple office programs.
+
+    Inputs can contain paths of documents or (input, output) path pairs.
+    If an output path is not given then it is derived from the input path
+    (and placed to an optional output_dir) with an extension
+    of the filter.
+
+    Documents are distributed over connections of a DesktopPool. If the
+    pool is not given then `workers` OfficeProcess instances are started
+    and stopped when all documents are converted. Number of worker
+    threads defaults to size of the pool.
+
+    Yields ConversionResult instances as documents are converted (not
+    necessarily in order of inputs). A failed conversion does not
+    stop the others, its exception is stored in the result.
+
+        >>> for result in convert_many(paths, FILTER_PDF_EXPORT, workers=4):
+        ...     if not result.ok:
+        ...         print(result.input, result.error)
+
+    """
+    processes = []
+    if pool is None:
+        processes = [OfficeProcess() for i in range(workers or 1)]
+        pool = DesktopPool.from_processes(processes)
+    workers = workers or len(pool)
+    inputs = iter(inputs)
+    inputs_lock = threading.Lock()
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def next_input():
+        with inputs_lock:
+            item = next(inputs, None)
+        if item is None or isinstance(item, tuple):
+            return item
+        return item, None
+
+    def work():
+        try:
+            while not stop.is_set():
+                item = next_input()
+                if item is None:
+                    break
+                input, output = item
+                try:
+                    if output is None:
+                        output = _get_conversion_output(input, filter_name, output_dir)
+                    _convert(pool, input, output, filter_name)
+                except Exception as e:
+                    results.put(ConversionResult(input, output, e))
+                else:
+                    results.put(ConversionResult(input, output))
+        finally:
+            # Signals that this worker is finished.
+            results.put(None)
+
+    threads = [threading.Thread(target=work, name='pyoo-convert-%d' % i) for i in range(workers)]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    try:
+        running = len(threads)
+        while running:
+            result = results.get()
+            if result is None:
+                running -= 1
+            else:
+                yield result
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
+        for process in processes:
+            process.stop()
+
+
+class AsyncDesktop(object):
+    """
+    Asynchronous (asyncio) access to an OpenOffice.org program.
+
+    Mirrors Desktop methods but returns awaitables. All UNO calls are run
+    in a single worker thread dedicated to the wrapped connection, so
+    calls to one document are executed in order without blocking an event
+    loop. Use one AsyncDesktop per office program (e.g. per OfficeProcess)
+    to process documents concurrently:
+
+        >>> desktop = AsyncDesktop(Desktop())
+        >>> doc = await desktop.open_spreadsheet('example.ods')
+        >>> sheet = await doc.get_sheet(0)
+        >>> values = await sheet[0:10, 0:5].get_values()
+        >>> await doc.save('example.xlsx', FILTER_EXCEL_2007)
+        >>> await doc.close()
+
+    Without an explicit loop, methods must be called from a coroutine
+    running in the event loop which awaits the results.
+
+    Requires Python 3.7+.
+
+    """
+
+    def __init__(self, desktop, loop=None):
+        # Imported here because asyncio is not available in Python 2
+        # and it is relatively expensive to import.
+        import asyncio
+        from concurrent.futures import ThreadPoolExecutor
+        self._asyncio = asyncio
+        self.desktop = desktop
+        self.loop = loop
+        self.executor = ThreadPoolExecutor(max_workers=1)
+
+    def create_spreadsheet(self, *args, **kwargs):
+        """
+        Creates a new spreadsheet document.
+
+        Returns an awaitable AsyncSpreadsheetDocument.
+        """
+        return self._run_document(self.desktop.create_spreadsheet, *args, **kwargs)
+
+    def open_spreadsheet(self, *args, **kwargs):
+        """
+        Opens an exiting spreadsheet document.
+
+        Returns an awaitable AsyncSpreadsheetDocument.
+        """
+        return self._run_document(self.desktop.open_spreadsheet, *args, **kwargs)
+
+    def run(self, func, *args, **kwargs):
+        """
+        Calls any function in the worker thread of this connection.
+
+        Can be used for operations not mirrored by asynchronous classes.
+        Returns an awaitable result.
+        """
+        loop = self.loop or self._asyncio.get_running_loop()
+        return loop.run_in_executor(self.executor, functools.partial(func, *args, **kwargs))
+
+    def shutdown(self, wait=True):
+        """
+        Stops the worker thread.
+        """
+        self.executor.shutdown(wait)
+
+    def _run_document(self, func, *args, **kwargs):
+        def open_document():
+            return AsyncSpreadsheetDocument(self, func(*args, **kwargs))
+        return self.run(open_document)
+
+
+class AsyncSpreadsheetDocument(object):
+    """
+    Asynchronous counterpart of SpreadsheetDocument.
+
+    Instances are returned by AsyncDesktop methods.
+    """
+
+    __slots__ = ('async_desktop', 'document')
+
+    def __init__(self, async_desktop, document):
+        self.async_desktop = async_desktop
+        self.document = document
+
+    def save(self, path=None, filter_name=None):
+        """
+        Saves this document, see SpreadsheetDocument.save.
+        """
+        return self.async_desktop.run(self.document.save, path, filter_name)
+
+    def close(self):
+        """
+        Closes this document.
+        """
+        return self.async_desktop.run(self.document.close)
+
+    def get_sheet(self, key):
+        """
+        Returns an awaitable AsyncCellRange of a sheet with the given index or name.
+        """
+        def get_sheet():
+            return AsyncCellRange(self.async_desktop, self.document.sheets[key])
+        return self.async_desktop.run(get_sheet)
+
+
+class AsyncCellRange(object):
+    """
+    Asynchronous counterpart of cell ranges.
+
+    Indexing is synchronous (it does not call UNO) and returns another
+    AsyncCellRange, values and formulas are read and written
+    by awaitable methods.
+    """
+
+    __slots__ = ('async_desktop', 'cells')
+
+    def __init__(self, async_desktop, cells):
+        self.async_desktop = async_desktop
+        self.cells = cells # Sheet, Cell or any other cell range
+
+    def __getitem__(self, key):
+        return AsyncCellRange(self.async_desktop, self.cells[key])
+
+    def __len__(self):
+        return len(self.cells)
+
+    def get_values(self):
+        """
+        Reads values (a value of a cell) of this range.
+        """
+        return self.async_desktop.run(getattr, self.cells, self._attr('values'))
+
+    def set_values(self, values):
+        """
+        Writes values (a value of a cell) of this range.
+        """
+        return self.async_desktop.run(setattr, self.cells, self._attr('values'), values)
+
+    def get_formulas(self):
+        """
+        Reads formulas (a formula of a cell) of this range.
+        """
+        return self.async_desktop.run(getattr, self.cells, self._attr('formulas'))
+
+    def set_formulas(self, formulas):
+        """
+        Writes formulas (a formula of a cell) of this range.
+        """
+        return self.async_desktop.run(setattr, self.cells, self._attr('formulas'), formulas)
+
+    def _attr(self, name):
+        # Single cells have value and formula attributes.
+        return name[:-1] if isinstance(self.cells, Cell) else name
 
 
 class NameGenerator(object):
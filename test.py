@@ -8,10 +8,36 @@ Copyright (c) 2016 Seznam.cz, a.s.
 
 import contextlib
 import datetime
+import io
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
 
+import uno
+
 import pyoo
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+try:
+    from shutil import which
+except ImportError:
+    from distutils.spawn import find_executable as which
+
 
 desktop = None
 
@@ -26,6 +52,47 @@ class MyObject(object):
         return u'my object'
 
 
+class ImportTestCase(unittest.TestCase):
+
+    def run_python(self, code):
+        path = os.path.dirname(os.path.abspath(pyoo.__file__))
+        output = subprocess.check_output([sys.executable, '-c', code], cwd=path)
+        return output.decode('ascii').strip()
+
+    def test_constants(self):
+        self.assertEqual(pyoo.FORMAT_TEXT,
+                         uno.getConstantByName('com.sun.star.i18n.NumberFormatIndex.TEXT'))
+        self.assertEqual(pyoo.UnoException, uno.getClass('com.sun.star.uno.Exception'))
+        self.assertIn('FONT_WEIGHT_BOLD', dir(pyoo))
+
+    def test_star_import(self):
+        names = {}
+        exec('from pyoo import *', names)
+        self.assertEqual(pyoo.FORMAT_INT, names['FORMAT_INT'])
+        self.assertEqual(pyoo.UnoException, names['UnoException'])
+        self.assertIn('Desktop', names)
+
+    def test_unknown_attribute(self):
+        self.assertRaises(AttributeError, getattr, pyoo, 'FORMAT_UNKNOWN')
+
+    @unittest.skipUnless(sys.version_info >= (3, 7), 'Constants are resolved lazily since Python 3.7.')
+    def test_constants_are_not_resolved_on_import(self):
+        output = self.run_python('import pyoo; print("FORMAT_TEXT" in vars(pyoo))')
+        self.assertEqual('False', output)
+
+    @unittest.skipUnless(sys.version_info >= (3, 7), 'Constants are resolved lazily since Python 3.7.')
+    def test_no_uno_lookups_on_import(self):
+        code = ('import uno\n'
+                'calls = []\n'
+                'def count(function):\n'
+                '    return lambda name: calls.append(name) or function(name)\n'
+                'uno.getConstantByName = count(uno.getConstantByName)\n'
+                'uno.getClass = count(uno.getClass)\n'
+                'import pyoo\n'
+                'print(len(calls))')
+        self.assertEqual('0', self.run_python(code))
+
+
 class SheetPositionTestCase(unittest.TestCase):
 
     if pyoo.PY2:
@@ -154,6 +221,12 @@ class BaseDocumentTestCase(unittest.TestCase):
     def tearDownClass(cls):
         cls.document.close()
 
+    def create_sheet(self, prefix):
+        """
+        Creates a new sheet with a unique name starting with the prefix.
+        """
+        return self.document.sheets.create('%s %d' % (prefix, len(self.document.sheets)))
+
 
 class CellRangeTestCase(BaseDocumentTestCase):
 
@@ -702,6 +775,649 @@ class CellRangeTestCase(BaseDocumentTestCase):
         self.assertEqual(fmt, self.sheet[0,0].number_format)
 
 
+class UsedAreaTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Used area')
+        self.sheet[2:5, 1:4].values = [[1, 2, 3], [4, 5, 6], [7, 8, 9]]
+
+    def test_used_range(self):
+        self.assertEqual('$B$3:$D$5', str(self.sheet.used_range.address))
+
+    def test_trimmed(self):
+        self.assertEqual('$A$1:$D$5', str(self.sheet[:, :].trimmed().address))
+        self.assertEqual('$C$4:$D$5', str(self.sheet[3:100, 2:100].trimmed().address))
+
+    def test_trimmed_outside_used_area(self):
+        self.assertEqual('$F$10', str(self.sheet[9:100, 5:100].trimmed().address))
+
+    def test_sheet_values(self):
+        values = self.sheet.values
+        self.assertEqual(5, len(values))
+        self.assertEqual(4, len(values[0]))
+        self.assertEqual(9, values[4][3])
+
+    def test_sheet_formulas(self):
+        formulas = self.sheet.formulas
+        self.assertEqual(5, len(formulas))
+        self.assertEqual('9', formulas[4][3])
+
+    def test_column_values(self):
+        self.assertEqual(('', '', 1, 4, 7), self.sheet[:, 1].values)
+
+    def test_row_values(self):
+        self.assertEqual(('', 1, 2, 3), self.sheet[2, :].values)
+
+    def test_bounded_range_is_not_trimmed(self):
+        self.assertEqual(10, len(self.sheet[0:10, 0:10].values))
+
+
+class ChunkedReadTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Chunked read')
+        self.data = tuple((float(i), float(i * 2)) for i in range(25))
+        self.sheet[0:25, 0:2].values = self.data
+
+    def test_iter_rows(self):
+        self.assertEqual(self.data, tuple(self.sheet[0:25, 0:2].iter_rows(chunk_rows=10)))
+
+    def test_iter_rows_is_trimmed(self):
+        self.assertEqual(self.data, tuple(self.sheet.iter_rows(chunk_rows=7)))
+
+    def test_iter_rows_formulas(self):
+        rows = tuple(self.sheet[0:3, 0:2].iter_rows(chunk_rows=2, formulas=True))
+        self.assertEqual((('0', '0'), ('1', '2'), ('2', '4')), rows)
+
+    def test_iter_values(self):
+        values = tuple(self.sheet[:, 1].iter_values(chunk_rows=4))
+        self.assertEqual(tuple(row[1] for row in self.data), values)
+
+    def test_iter_is_lazy(self):
+        rows = self.sheet[0:25, 0:2].iter_rows(chunk_rows=10)
+        self.assertEqual(self.data[0], next(rows))
+        # Cursor can be used between chunks.
+        self.sheet[30, 0].value = 1
+        self.assertEqual(self.data[1:], tuple(rows))
+
+    def test_invalid_chunk(self):
+        self.assertRaises(ValueError, list, self.sheet.iter_rows(chunk_rows=0))
+
+
+class ChunkedWriteTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Chunked write')
+
+    def test_write_rows(self):
+        rows = ((i, i * 2) for i in range(25))
+        count = self.sheet[0:25, 0:2].write_rows(rows, chunk_rows=10)
+        self.assertEqual(25, count)
+        self.assertEqual((24, 48), self.sheet[24, 0:2].values)
+
+    def test_write_narrow_rows(self):
+        self.sheet.write_rows(([i] for i in range(5)), chunk_rows=2)
+        self.assertEqual((0, 1, 2, 3, 4), self.sheet[:, 0].values)
+
+    def test_write_formulas(self):
+        rows = (['=%d*2' % i] for i in range(3))
+        self.sheet[0:3, 0:1].write_rows(rows, formulas=True)
+        self.assertEqual(('=0*2', '=1*2', '=2*2'), self.sheet[0:3, 0].formulas)
+        self.assertEqual((0, 2, 4), self.sheet[0:3, 0].values)
+
+    def test_too_many_rows(self):
+        rows = ([i] for i in range(10))
+        self.assertRaises(ValueError, self.sheet[0:5, 0:1].write_rows, rows)
+
+    def test_too_many_rows_in_chunks(self):
+        rows = ([i] for i in range(5))
+        self.assertRaises(ValueError, self.sheet[0:3, 0:1].write_rows, rows, chunk_rows=2)
+        self.assertEqual((0, 1, 2), self.sheet[0:3, 0].values)
+
+    def test_extend(self):
+        rows = ([i] for i in range(10))
+        self.assertEqual(10, self.sheet[0:5, 0:1].write_rows(rows, chunk_rows=3, extend=True))
+        self.assertEqual(9, self.sheet[9, 0].value)
+
+    def test_rows_with_different_length(self):
+        self.assertRaises(ValueError, self.sheet.write_rows, [[1, 2], [3]])
+
+    def test_too_wide_rows(self):
+        self.assertRaises(ValueError, self.sheet[0:2, 0:2].write_rows, [[1, 2, 3]])
+
+    def test_no_rows(self):
+        self.assertEqual(0, self.sheet.write_rows([]))
+
+
+class TypedWriteTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Typed')
+
+    def test_write_typed(self):
+        rows = [(1, 1.5, 'a', True), (2, 2.5, 'b', False)]
+        self.assertEqual(2, self.sheet.write_typed(rows, (int, float, str, bool)))
+        self.assertEqual(((1, 1.5, 'a', 1), (2, 2.5, 'b', 0)), self.sheet[0:2, 0:4].values)
+
+    def test_write_typed_large_integers(self):
+        self.sheet.write_typed([(2 ** 40,)], (int,))
+        self.assertEqual(2 ** 40, self.sheet[0, 0].value)
+
+    def test_write_typed_dates(self):
+        types = (datetime.date, datetime.datetime, datetime.time)
+        self.sheet.write_typed([(datetime.date(2016, 1, 2),
+                                 datetime.datetime(2016, 1, 2, 12, 30),
+                                 datetime.time(6, 30))], types)
+        self.assertEqual(datetime.datetime(2016, 1, 2), self.sheet[0, 0].date)
+        self.assertEqual(datetime.datetime(2016, 1, 2, 12, 30), self.sheet[0, 1].date)
+        self.assertEqual(datetime.time(6, 30), self.sheet[0, 2].time)
+
+    def test_write_typed_none(self):
+        self.sheet.write_typed([(None, datetime.date(2016, 1, 2)), (1, None)], (int, None))
+        self.assertEqual(datetime.datetime(2016, 1, 2), self.sheet[0, 1].date)
+        self.assertEqual(1, self.sheet[1, 0].value)
+
+    def test_write_typed_chunks(self):
+        self.sheet.write_typed(([i] for i in range(5)), (int,), chunk_rows=2)
+        self.assertEqual((0, 1, 2, 3, 4), self.sheet[0:5, 0].values)
+
+    def test_row_length(self):
+        self.assertRaises(ValueError, self.sheet.write_typed, [(1, 2)], (int,))
+
+    def test_unsupported_type(self):
+        self.assertRaises(TypeError, self.sheet.write_typed, [(1,)], (list,))
+
+
+class BatchTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Batch')
+
+    def test_batch(self):
+        with self.sheet.batch():
+            for row in range(3):
+                for col in range(2):
+                    self.sheet[row, col].value = row * 2 + col
+            self.sheet[5, 5].formula = '=A1+1'
+        self.assertEqual(((0, 1), (2, 3), (4, 5)), self.sheet[0:3, 0:2].values)
+        self.assertEqual(1, self.sheet[5, 5].value)
+
+    def test_last_write_wins(self):
+        with self.sheet.batch():
+            self.sheet[0, 0].formula = '=1+1'
+            self.sheet[0, 0].value = 'text'
+            self.sheet[0, 1].value = 1
+            self.sheet[0, 0:2].values = [3, 4]
+        self.assertEqual((3, 4), self.sheet[0, 0:2].values)
+
+    def test_read_inside_batch(self):
+        with self.sheet.batch():
+            self.sheet[0, 0].value = 1
+            self.assertEqual(1, self.sheet[0, 0].value)
+
+    def test_nested_batch(self):
+        with self.sheet.batch():
+            with self.sheet.batch():
+                self.sheet[0, 0].value = 1
+            self.sheet[0, 1].value = 2
+        self.assertEqual((1, 2), self.sheet[0, 0:2].values)
+
+    def test_batch_exception(self):
+        try:
+            with self.sheet.batch():
+                self.sheet[0, 0].value = 1
+                raise ValueError()
+        except ValueError:
+            pass
+        self.assertEqual(1, self.sheet[0, 0].value)
+
+
+class SnapshotTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Snapshot')
+        self.other = self.document.sheets[self.sheet.name]
+        self.sheet[0:2, 0:2].values = [[1, 2], [3, '=A1']]
+
+    def test_snapshot(self):
+        with self.sheet.snapshot():
+            self.assertEqual(1, self.sheet[0, 0].value)
+            self.assertEqual(((2,), (3,)), self.sheet[0:2, 1:2].values)
+            self.assertEqual(('', ''), self.sheet[5, 0:2].values)
+            self.assertEqual((1, 3), self.sheet[:, 0].values)
+
+    def test_snapshot_formulas(self):
+        with self.sheet.snapshot():
+            self.assertEqual('=A1', self.sheet[1, 1].formula)
+
+    def test_own_writes(self):
+        with self.sheet.snapshot():
+            self.assertEqual(1, self.sheet[1, 1].value)
+            self.sheet[0, 0].value = 5
+            self.assertEqual(5, self.sheet[1, 1].value)
+            self.sheet[3, 0].value = 6
+            self.assertEqual((5, 3, '', 6), self.sheet[:, 0].values)
+
+    def test_refresh(self):
+        with self.sheet.snapshot():
+            self.assertEqual(1, self.sheet[0, 0].value)
+            self.other[0, 0].value = 5
+            self.assertEqual(1, self.sheet[0, 0].value)
+            self.sheet.refresh()
+            self.assertEqual(5, self.sheet[0, 0].value)
+
+    def test_listen(self):
+        with self.sheet.snapshot(listen=True):
+            self.assertEqual(1, self.sheet[0, 0].value)
+            # Write of another object is seen only by the listener.
+            self.other[0, 0].value = 5
+            self.assertEqual(5, self.sheet[0, 0].value)
+            self.assertEqual(5, self.sheet[1, 1].value)
+        self.other[0, 0].value = 6
+        self.assertEqual(6, self.sheet[0, 0].value)
+
+
+class UpdateValuesTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Update')
+        self.sheet[0:3, 0:3].values = [[1, 2, 3], [4, 5, 6], [7, 8, 'text']]
+
+    def test_update_values(self):
+        written = self.sheet[0:3, 0:3].update_values([[1, 2, 3], [4, 0, 0], [7, 0, 'text']])
+        self.assertEqual(3, written)
+        self.assertEqual(((1, 2, 3), (4, 0, 0), (7, 0, 'text')), self.sheet[0:3, 0:3].values)
+
+    def test_unchanged(self):
+        self.assertEqual(0, self.sheet[0:3, 0:3].update_values([[1, 2, 3], [4, 5, 6], [7, 8, 'text']]))
+
+    def test_smaller_values(self):
+        self.assertEqual(1, self.sheet[0:3, 0:3].update_values([[1, 9]]))
+        self.assertEqual((1, 9, 3), self.sheet[0, 0:3].values)
+
+    def test_clear(self):
+        self.assertEqual(1, self.sheet[0, 0:3].update_values([1, None, 3]))
+        self.assertEqual((1, '', 3), self.sheet[0, 0:3].values)
+
+    def test_vertical(self):
+        self.assertEqual(2, self.sheet[0:4, 0].update_values([1, 4, 0, 0]))
+        self.assertEqual((1, 4, 0, 0), self.sheet[0:4, 0].values)
+
+    def test_too_many_values(self):
+        self.assertRaises(ValueError, self.sheet[0:2, 0:2].update_values, [[1, 2, 3]])
+
+
+class WriteCellsTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Cells')
+
+    def test_write_cells(self):
+        self.sheet.write_cells({(0, 0): 1, (0, 1): 'text', (1, 0): 3, (5, 5): 4})
+        self.assertEqual(((1, 'text'), (3, '')), self.sheet[0:2, 0:2].values)
+        self.assertEqual(4, self.sheet[5, 5].value)
+
+    def test_keeps_other_cells(self):
+        self.sheet[0:2, 0:2].values = [['a', 'b'], ['c', 'd']]
+        self.sheet.write_cells({(0, 0): 1, (1, 1): 2})
+        self.assertEqual(((1, 'b'), ('c', 2)), self.sheet[0:2, 0:2].values)
+
+    def test_rewrite_block(self):
+        # Diagonal is sparse enough to be written as one block.
+        self.sheet[0, 1].formula = '=A1*2'
+        self.sheet[1, 0].value = 1.5
+        self.sheet.write_cells(dict(((i, i), i + 1) for i in range(20)))
+        self.assertEqual(((1, 2), (1.5, 2)), self.sheet[0:2, 0:2].values)
+        self.assertEqual('=A1*2', self.sheet[0, 1].formula)
+        self.assertEqual(20, self.sheet[19, 19].value)
+
+    def test_rewrite_block_with_text(self):
+        self.sheet[0, 1].value = '1'
+        self.sheet.write_cells(dict(((i, i), i + 1) for i in range(20)))
+        self.assertEqual('1', self.sheet[0, 1].value)
+        self.assertEqual(20, self.sheet[19, 19].value)
+
+    def test_rewrite_block_with_array_formula(self):
+        # Array formula reaches outside of the bounding block of the cells.
+        self.sheet[0:2, 0].values = [1, 2]
+        matrix = self.sheet[18:21, 1]
+        matrix._get_target().setArrayFormula('=A1:A3*2')
+        self.sheet.write_cells(dict(((i, i), i + 1) for i in range(2, 20)))
+        self.assertEqual('{=A1:A3*2}', self.sheet[18, 1].formula)
+        self.assertEqual('=A1:A3*2', matrix._get_target().getArrayFormula())
+        self.assertEqual(20, self.sheet[19, 19].value)
+
+    def test_no_cells(self):
+        self.sheet.write_cells({})
+
+
+class FillTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Fill')
+
+    def test_fill_down(self):
+        self.sheet[0:3, 0].values = [1, 2, 3]
+        self.sheet[0:3, 1].fill_down('=A1*2')
+        self.assertEqual('=A3*2', self.sheet[2, 1].formula)
+        self.assertEqual((2, 4, 6), self.sheet[0:3, 1].values)
+
+    def test_fill_down_series(self):
+        self.sheet[0:2, 0].values = [1, 3]
+        self.sheet[0:4, 0].fill_down(source_rows=2)
+        self.assertEqual((1, 3, 5, 7), self.sheet[0:4, 0].values)
+
+    def test_fill_right(self):
+        self.sheet[0, 0:3].values = [1, 2, 3]
+        self.sheet[1, 0:3].fill_right('=A1+1')
+        self.assertEqual((2, 3, 4), self.sheet[1, 0:3].values)
+
+    def test_fill_series(self):
+        self.sheet[0:5, 0].fill_series(start=10, step=5, end=25)
+        self.assertEqual((10, 15, 20, 25, ''), self.sheet[0:5, 0].values)
+
+    def test_fill_series_growth(self):
+        self.sheet[0, 0:4].fill_series(start=1, step=2, mode=pyoo.FILL_MODE_GROWTH, right=True)
+        self.assertEqual((1, 2, 4, 8), self.sheet[0, 0:4].values)
+
+    def test_fill_series_dates(self):
+        self.sheet[0:3, 0].fill_series(start=datetime.date(2016, 1, 31), mode=pyoo.FILL_MODE_DATE,
+                                       date_mode=pyoo.FILL_DATE_MONTH)
+        self.assertEqual(datetime.datetime(2016, 3, 31), self.sheet[2, 0].date)
+
+    def test_invalid_source(self):
+        self.assertRaises(ValueError, self.sheet[0:2, 0].fill_down, source_rows=3)
+
+
+class MovementTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Movement')
+        self.sheet[0:2, 0:2].values = [[1, 2], [3, '=A1*2']]
+
+    def test_copy_to(self):
+        copied = self.sheet[0:2, 0:2].copy_to(self.sheet[5, 5])
+        self.assertEqual('$F$6:$G$7', str(copied.address))
+        self.assertEqual(((1, 2), (3, 2)), copied.values)
+        self.assertEqual('=F6*2', copied[1, 1].formula)
+        self.assertEqual(1, self.sheet[0, 0].value)
+
+    def test_copy_to_other_sheet(self):
+        other = self.document.sheets.create('%s copy' % self.sheet.name)
+        copied = self.sheet[0:2, 0].copy_to(other[1:5, 1:5])
+        self.assertEqual((1, 3), copied.values)
+        self.assertEqual((1, 3), other[1:3, 1].values)
+
+    def test_move_to(self):
+        moved = self.sheet[0:2, 0:2].move_to(self.sheet[0, 3])
+        self.assertEqual(((1, 2), (3, 2)), moved.values)
+        self.assertEqual('=D1*2', moved[1, 1].formula)
+        self.assertEqual('', self.sheet[0, 0].value)
+
+    def test_other_document(self):
+        doc = desktop.create_spreadsheet()
+        try:
+            self.assertRaises(ValueError, self.sheet[0, 0].copy_to, doc.sheets[0][0, 0])
+        finally:
+            doc.close()
+
+    def test_import_from(self):
+        doc = desktop.create_spreadsheet()
+        try:
+            doc.sheets[0].name = 'Imported %d' % len(self.document.sheets)
+            doc.sheets[0][0, 0].formula = '=1+1'
+            imported = self.document.sheets.import_from(doc, doc.sheets[0].name)
+            self.assertEqual(doc.sheets[0].name, imported.name)
+            self.assertEqual('=1+1', imported[0, 0].formula)
+            self.assertEqual(len(self.document.sheets) - 1, imported.index)
+            self.assertRaises(KeyError, self.document.sheets.import_from, doc, 'Unknown')
+        finally:
+            doc.close()
+
+
+class AggregateTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Aggregate')
+        self.sheet[0:4, 0:2].values = [[1, 10], [2, 'text'], [3, 30], [6, None]]
+
+    def test_aggregate(self):
+        column = self.sheet[0:4, 0]
+        self.assertEqual(12, column.aggregate('sum'))
+        self.assertEqual(3, column.aggregate('average'))
+        self.assertEqual(1, column.aggregate('min'))
+        self.assertEqual(6, column.aggregate('max'))
+        self.assertEqual(36, column.aggregate('product'))
+
+    def test_count(self):
+        column = self.sheet[0:4, 1]
+        self.assertEqual(3, column.aggregate('count'))
+        self.assertEqual(2, column.aggregate('count_numbers'))
+
+    def test_aggregates(self):
+        self.assertEqual({'sum': 52, 'max': 30}, self.sheet[0:4, 0:2].aggregates(['sum', 'max']))
+
+    def test_column_aggregates(self):
+        self.assertEqual([{'sum': 12, 'count_numbers': 4}, {'sum': 40, 'count_numbers': 2}],
+                         self.sheet.column_aggregates(['sum', 'count_numbers']))
+
+    def test_unknown_function(self):
+        self.assertRaises(ValueError, self.sheet[0:4, 0].aggregate, 'median')
+
+    def test_no_numbers(self):
+        self.assertRaises(ValueError, self.sheet[10:12, 0].aggregate, 'average')
+
+
+class SortFilterTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Sort')
+        self.sheet[0:5, 0:2].values = [['n', 's'], [3, 'c'], [1, 'b'], [2, 'a'], [1, 'a']]
+
+    def is_visible(self, row):
+        return self.sheet._target.getRows().getByIndex(row).getPropertyValue('IsVisible')
+
+    def test_sort(self):
+        self.sheet[0:5, 0:2].sort(has_header=True)
+        self.assertEqual(('n', 1, 1, 2, 3), self.sheet[0:5, 0].values)
+
+    def test_sort_keys(self):
+        self.sheet[1:5, 0:2].sort([(0, True), (1, False)])
+        self.assertEqual(((1, 'b'), (1, 'a'), (2, 'a'), (3, 'c')), self.sheet[1:5, 0:2].values)
+
+    def test_sort_descending(self):
+        self.sheet[:, 0:2].sort([(1, False)], has_header=True)
+        self.assertEqual(('s', 'c', 'b', 'a', 'a'), self.sheet[0:5, 1].values)
+
+    def test_filter(self):
+        self.sheet[0:5, 0:2].filter([(0, '<', 3), (1, '=', 'a')], has_header=True)
+        self.assertEqual([True, False, False, True, True], [self.is_visible(i) for i in range(5)])
+        self.sheet[0:5, 0:2].clear_filter()
+        self.assertEqual([True] * 5, [self.is_visible(i) for i in range(5)])
+
+    def test_filter_match_any(self):
+        self.sheet[1:5, 0:2].filter([(0, '=', 3), (1, '=', 'b')], match_any=True)
+        self.assertEqual([True, True, True, False, False], [self.is_visible(i) for i in range(5)])
+        self.sheet[1:5, 0:2].clear_filter()
+
+    def test_unknown_operator(self):
+        self.assertRaises(ValueError, self.sheet[0:5, 0:2].filter, [(0, '~', 1)])
+
+
+@unittest.skipUnless(os.environ.get('PYOO_BENCHMARK'), 'Set PYOO_BENCHMARK to run benchmarks.')
+class SortBenchmarkTestCase(BaseDocumentTestCase):
+    """
+    Compares sorting by the office with reading, sorting and writing rows.
+
+    Timings are only reported because they depend on the machine.
+    """
+
+    rows = 20000
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Benchmark')
+        values = [[(i * 7919) % self.rows, i % 10, 'row %d' % i] for i in range(self.rows)]
+        self.sheet[0:self.rows, 0:3].values = values
+        self.expected = tuple(tuple(row) for row in sorted(values))
+
+    def test_sort_benchmark(self):
+        cells = self.sheet[0:self.rows, 0:3]
+        start = time.time()
+        cells.sort()
+        sort_time = time.time() - start
+        self.assertEqual(self.expected, cells.values)
+
+        self.sheet[0:self.rows, 0:3].values = self.expected[::-1]
+        start = time.time()
+        cells.values = sorted(cells.values)
+        round_trip_time = time.time() - start
+        self.assertEqual(self.expected, cells.values)
+
+        sys.stderr.write('\nsort: %.3f s, round trip: %.3f s ' % (sort_time, round_trip_time))
+
+
+class NumericValuesTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Numeric')
+
+    def test_values_numeric(self):
+        self.sheet[0:2, 0:2].values = [[1, 2.5], [3, 4]]
+        rows = self.sheet[0:2, 0:2].values_numeric
+        self.assertEqual([[1, 2.5], [3, 4]], [list(row) for row in rows])
+        self.assertEqual('d', rows[0].typecode)
+
+    def test_values_numeric_not_numbers(self):
+        self.sheet[0, 0:2].values = [1, 'text']
+        row, = self.sheet[0:1, 0:3].values_numeric
+        self.assertEqual(1, row[0])
+        self.assertNotEqual(row[1], row[1])
+        self.assertNotEqual(row[2], row[2])
+
+    def test_values_numeric_hidden_row(self):
+        self.sheet[0:3, 0].values = [1, 2, 3]
+        self.sheet[0:3, 0:1].filter([(0, '!=', 2)])
+        try:
+            rows = self.sheet[0:3, 0:1].values_numeric
+        finally:
+            self.sheet[0:3, 0:1].clear_filter()
+        self.assertEqual([[1], [2], [3]], [list(row) for row in rows])
+
+    def test_values_numeric_used_area(self):
+        self.sheet[0:2, 0].values = [1, 2]
+        self.assertEqual(2, len(self.sheet[:, 0:1].values_numeric))
+
+
+@unittest.skipIf(numpy is None, 'NumPy is not available.')
+class NumpyTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('NumPy')
+
+    def test_to_numpy(self):
+        self.sheet[0:2, 0:3].values = [[1, 'text', None], [2, 3, 4]]
+        self.sheet[0, 2].formula = ''
+        array = self.sheet[0:2, 0:3].to_numpy()
+        self.assertEqual((2, 3), array.shape)
+        self.assertEqual(numpy.float64, array.dtype)
+        self.assertEqual(1, array[0, 0])
+        self.assertTrue(numpy.isnan(array[0, 1]))
+        self.assertTrue(numpy.isnan(array[0, 2]))
+        self.assertEqual(4, array[1, 2])
+
+    def test_to_masked_numpy(self):
+        self.sheet[0, 0:2].values = [1, 'text']
+        array = self.sheet[0, 0:2].to_numpy(masked=True)
+        self.assertEqual([False, True], list(array.mask))
+
+    def test_to_numpy_dates(self):
+        self.sheet[0:2, 0].values = [datetime.datetime(2016, 1, 2, 12, 30), 'text']
+        array = self.sheet[0:2, 0].to_numpy('datetime64[s]')
+        self.assertEqual(numpy.datetime64('2016-01-02T12:30:00'), array[0])
+        self.assertTrue(numpy.isnat(array[1]))
+
+    def test_to_numpy_objects(self):
+        self.sheet[0, 0:2].values = [1, 'text']
+        self.assertEqual([1, 'text'], list(self.sheet[0, 0:2].to_numpy(object)))
+
+    def test_from_numpy(self):
+        self.sheet[0:2, 0:2].from_numpy(numpy.array([[1.5, numpy.nan], [3, 4]]))
+        self.assertEqual(((1.5, ''), (3, 4)), self.sheet[0:2, 0:2].values)
+
+    def test_from_numpy_large_integers(self):
+        self.sheet[0:2, 0].from_numpy(numpy.array([1, 2 ** 40]))
+        self.assertEqual((1, 2 ** 40), self.sheet[0:2, 0].values)
+
+    def test_from_numpy_dates(self):
+        self.sheet[0, 0:1].from_numpy(numpy.array(['2016-01-02'], dtype='datetime64[D]'))
+        self.assertEqual(datetime.datetime(2016, 1, 2), self.sheet[0, 0].date)
+
+    def test_from_numpy_strings(self):
+        self.sheet[0, 0:2].from_numpy(numpy.array(['a', 'b']))
+        self.assertEqual(('a', 'b'), self.sheet[0, 0:2].values)
+
+    def test_from_numpy_objects(self):
+        self.sheet[0, 0:2].from_numpy(numpy.array([1, datetime.date(2016, 1, 2)], dtype=object))
+        self.assertEqual(datetime.datetime(2016, 1, 2), self.sheet[0, 1].date)
+
+    def test_from_numpy_dimensions(self):
+        self.assertRaises(ValueError, self.sheet[0:2, 0:2].from_numpy, numpy.zeros(4))
+        self.assertRaises(ValueError, self.sheet[0, 0:2].from_numpy, numpy.zeros((1, 2)))
+
+
+@unittest.skipIf(pandas is None, 'Pandas is not available.')
+class DataFrameTestCase(BaseDocumentTestCase):
+
+    def setUp(self):
+        self.sheet = self.create_sheet('Pandas')
+
+    def test_to_dataframe(self):
+        self.sheet[0:3, 0:2].values = [['a', 'b'], [1, 'x'], [None, 'y']]
+        df = self.sheet[0:3, 0:2].to_dataframe()
+        self.assertEqual(['a', 'b'], list(df.columns))
+        self.assertEqual(numpy.float64, df['a'].dtype)
+        self.assertEqual(1, df['a'][0])
+        self.assertTrue(numpy.isnan(df['a'][1]))
+        self.assertEqual(['x', 'y'], list(df['b']))
+
+    def test_to_dataframe_header_names(self):
+        self.sheet[0:2, 0:4].values = [['a', '', 'a', 2016], [1, 2, 3, 4]]
+        df = self.sheet[0:2, 0:4].to_dataframe()
+        self.assertEqual(['a', 'Unnamed: 1', 'a.1', '2016'], list(df.columns))
+        self.assertEqual([1, 2, 3, 4], list(df.iloc[0]))
+
+    def test_to_dataframe_without_header(self):
+        self.sheet[0:2, 0].values = [1, 2]
+        df = self.sheet[0:2, 0:1].to_dataframe(header=False)
+        self.assertEqual([1, 2], list(df[0]))
+
+    def test_to_dataframe_dates(self):
+        self.sheet[0:2, 0].values = ['date', datetime.date(2016, 1, 2)]
+        df = self.sheet[0:2, 0:1].to_dataframe(parse_dates=['date'])
+        self.assertEqual(pandas.Timestamp('2016-01-02'), df['date'][0])
+
+    def test_write_dataframe(self):
+        df = pandas.DataFrame({'a': [1.5, None], 'b': ['x', 'y']})
+        written = self.sheet.write_dataframe(df, at=(1, 1))
+        self.assertEqual('$B$2:$C$4', str(written.address))
+        self.assertEqual((('a', 'b'), (1.5, 'x'), ('', 'y')), written.values)
+
+    def test_write_dataframe_index(self):
+        df = pandas.DataFrame({'a': [1, 2]}, index=pandas.Index([10, 20], name='key'))
+        written = self.sheet.write_dataframe(df, index=True, header=False)
+        self.assertEqual(((10, 1), (20, 2)), written.values)
+
+    def test_write_dataframe_chunked(self):
+        df = pandas.DataFrame({'a': range(5)})
+        self.sheet.write_dataframe(df, chunk_rows=2)
+        self.assertEqual(('a', 0, 1, 2, 3, 4), self.sheet[0:6, 0].values)
+
+    def test_dataframe_round_trip(self):
+        df = pandas.DataFrame({'a': [1.0, 2.0], 'b': ['x', 'y']})
+        written = self.sheet.write_dataframe(df)
+        self.assertTrue(df.equals(written.to_dataframe()))
+
+
 class ChartsTestCase(BaseDocumentTestCase):
 
     _chart_index = 0
@@ -1044,6 +1760,521 @@ class SpreadsheetCollectionTestCase(BaseDocumentTestCase):
         self.assertEqual(0, self.document.sheets[0].index)
 
 
+class LoadOptionsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.path = os.path.join(self.directory, 'doc.ods')
+        doc = desktop.create_spreadsheet()
+        try:
+            doc.sheets[0][0, 0].value = 'hello'
+            doc.save(self.path)
+        finally:
+            doc.close()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def test_batch_options(self):
+        doc = desktop.open_spreadsheet(self.path, **pyoo.LOAD_OPTIONS_BATCH)
+        try:
+            self.assertEqual('hello', doc.sheets[0][0, 0].value)
+            self.assertEqual(['doc.ods'], os.listdir(self.directory))
+        finally:
+            doc.close()
+
+    def test_read_only(self):
+        doc = desktop.open_spreadsheet(self.path, read_only=True)
+        try:
+            self.assertTrue(doc._target.isReadonly())
+        finally:
+            doc.close()
+
+    def test_default_options(self):
+        pyoo_desktop = pyoo.Desktop(load_options={'read_only': True})
+        doc = pyoo_desktop.open_spreadsheet(self.path)
+        try:
+            self.assertTrue(doc._target.isReadonly())
+        finally:
+            doc.close()
+
+    def test_hidden_spreadsheet(self):
+        doc = desktop.create_spreadsheet(hidden=True, macros=False)
+        doc.sheets[0][0, 0].value = 1
+        doc.close()
+
+    def test_unknown_option(self):
+        self.assertRaises(TypeError, desktop.open_spreadsheet, self.path, foo=True)
+        self.assertRaises(TypeError, desktop.create_spreadsheet, read_only=True)
+
+
+class DocumentStreamTestCase(unittest.TestCase):
+
+    def test_save_to_file_object(self):
+        doc = desktop.create_spreadsheet()
+        try:
+            output = io.BytesIO()
+            doc.save(output, pyoo.FILTER_EXCEL_2007)
+        finally:
+            doc.close()
+        # XLSX files are zip archives
+        self.assertEqual(b'PK', output.getvalue()[:2])
+
+    def test_to_bytes(self):
+        doc = desktop.create_spreadsheet()
+        try:
+            data = doc.to_bytes(pyoo.FILTER_PDF_EXPORT)
+        finally:
+            doc.close()
+        self.assertEqual(b'%PDF', data[:4])
+
+    def test_open_from_file_object(self):
+        doc = desktop.create_spreadsheet()
+        try:
+            doc.sheets[0][0, 0].value = 'hello'
+            data = doc.to_bytes()
+        finally:
+            doc.close()
+        doc = desktop.open_spreadsheet(io.BytesIO(data))
+        try:
+            self.assertEqual('hello', doc.sheets[0][0, 0].value)
+        finally:
+            doc.close()
+
+
+class LazyDesktopTestCase(unittest.TestCase):
+
+    def test_connection_is_cached(self):
+        lazy = pyoo.LazyDesktop()
+        self.assertIs(lazy.desktop, lazy.desktop)
+
+    def test_create_spreadsheet(self):
+        lazy = pyoo.LazyDesktop()
+        doc = lazy.create_spreadsheet()
+        doc.close()
+
+    def test_missing_file_is_not_retried(self):
+        lazy = pyoo.LazyDesktop(backoff=10)
+        self.assertRaises(IOError, lazy.open_spreadsheet, '/nonexistent/file.ods')
+
+    def test_connection_failure(self):
+        lazy = pyoo.LazyDesktop(port=1, retries=1, backoff=0)
+        self.assertRaises(IOError, lazy.create_spreadsheet)
+
+    def test_stream_is_read_once(self):
+        doc = desktop.create_spreadsheet()
+        try:
+            doc.sheets[0][0, 0].value = 'hello'
+            data = doc.to_bytes()
+        finally:
+            doc.close()
+        attempts = []
+
+        class DisconnectedDesktop(pyoo.Desktop):
+            def open_spreadsheet(self, path, *args, **kwargs):
+                if not attempts:
+                    # Bridge is lost after the stream is consumed.
+                    attempts.append(path.read())
+                    raise pyoo._uno.DisposedException('', None)
+                return super(DisconnectedDesktop, self).open_spreadsheet(path, *args, **kwargs)
+
+        class Lazy(pyoo.LazyDesktop):
+            cls = DisconnectedDesktop
+
+        doc = Lazy(backoff=0).open_spreadsheet(io.BytesIO(data))
+        try:
+            self.assertEqual('hello', doc.sheets[0][0, 0].value)
+        finally:
+            doc.close()
+
+
+@unittest.skipUnless(which(pyoo.OfficeProcess.binary), 'Office binary is not available.')
+class OfficeProcessTestCase(unittest.TestCase):
+
+    def test_start_and_stop(self):
+        process = pyoo.OfficeProcess()
+        process.start()
+        try:
+            self.assertTrue(process.running)
+            self.assertTrue(process.desktop.is_alive())
+        finally:
+            process.stop()
+        self.assertFalse(process.running)
+        self.assertEqual(None, process.pid)
+
+    def test_context_manager(self):
+        with pyoo.OfficeProcess(warm_up=False) as process:
+            doc = process.desktop.create_spreadsheet()
+            doc.close()
+        self.assertFalse(process.running)
+
+    def test_free_port(self):
+        with pyoo.OfficeProcess(port=0, warm_up=False) as process:
+            self.assertTrue(process.port > 0)
+            self.assertTrue(process.desktop.is_alive())
+
+    def test_restart(self):
+        with pyoo.OfficeProcess(warm_up=False) as process:
+            pid = process.pid
+            process.restart()
+            self.assertNotEqual(pid, process.pid)
+            self.assertTrue(process.desktop.is_alive())
+
+    def test_connect_restarts_killed_process(self):
+        with pyoo.OfficeProcess(warm_up=False) as process:
+            process._process.kill()
+            process._process.wait()
+            self.assertTrue(process.connect().is_alive())
+
+    def test_invalid_binary(self):
+        process = pyoo.OfficeProcess(binary='/nonexistent/soffice')
+        self.assertRaises(OSError, process.start)
+
+    @unittest.skipUnless(os.path.isdir('/proc'), 'Process file system is not available.')
+    def test_stop_kills_children(self):
+        process = pyoo.OfficeProcess(timeout=0.5)
+        # Launcher which does not exit when asked, like a hung office.
+        process._process = subprocess.Popen(['sh', '-c', 'sleep 60 & wait'])
+        time.sleep(0.2)
+        children = pyoo._get_children(process.pid)
+        self.assertTrue(children)
+        process.stop()
+        for pid in children:
+            try:
+                with open('/proc/%d/stat' % pid) as f:
+                    # Killed child can stay a zombie until it is reaped.
+                    self.assertEqual('Z', f.read().rsplit(')', 1)[1].split()[0])
+            except IOError:
+                pass
+
+
+@unittest.skipUnless(sys.version_info >= (3, 7), 'Asyncio is not available.')
+class AsyncDesktopTestCase(unittest.TestCase):
+
+    def setUp(self):
+        import asyncio
+        self.loop = asyncio.new_event_loop()
+        self.desktop = pyoo.AsyncDesktop(desktop, loop=self.loop)
+
+    def tearDown(self):
+        self.desktop.shutdown()
+        self.loop.close()
+
+    def run_async(self, awaitable):
+        return self.loop.run_until_complete(awaitable)
+
+    def test_create_spreadsheet(self):
+        doc = self.run_async(self.desktop.create_spreadsheet())
+        self.assertIsInstance(doc, pyoo.AsyncSpreadsheetDocument)
+        self.assertIsInstance(doc.document, pyoo.SpreadsheetDocument)
+        self.run_async(doc.close())
+
+    def test_values(self):
+        doc = self.run_async(self.desktop.create_spreadsheet())
+        try:
+            sheet = self.run_async(doc.get_sheet(0))
+            self.run_async(sheet[0:2, 0:2].set_values([[1, 2], [3, 4]]))
+            self.assertEqual(((1, 2), (3, 4)), self.run_async(sheet[0:2, 0:2].get_values()))
+            self.assertEqual(4, self.run_async(sheet[1, 1].get_values()))
+        finally:
+            self.run_async(doc.close())
+
+    def test_formulas(self):
+        doc = self.run_async(self.desktop.create_spreadsheet())
+        try:
+            sheet = self.run_async(doc.get_sheet(0))
+            self.run_async(sheet[0, 0:2].set_formulas(['=1+1', '=$A$1*2']))
+            self.assertEqual(('=1+1', '=$A$1*2'), self.run_async(sheet[0, 0:2].get_formulas()))
+            self.assertEqual(4, self.run_async(sheet[0, 1].get_values()))
+        finally:
+            self.run_async(doc.close())
+
+    def test_calls_are_ordered(self):
+        doc = self.run_async(self.desktop.create_spreadsheet())
+        try:
+            sheet = self.run_async(doc.get_sheet(0))
+            cell = sheet[0, 0]
+            futures = [cell.set_values(i) for i in range(10)]
+            futures.append(cell.get_values())
+            import asyncio
+            results = self.run_async(asyncio.gather(*futures))
+            self.assertEqual(9, results[-1])
+        finally:
+            self.run_async(doc.close())
+
+
+class WatchdogTestCase(unittest.TestCase):
+
+    def test_not_expired(self):
+        watchdog = pyoo.Watchdog()
+        calls = []
+        with watchdog.watch(10, lambda: calls.append(1)) as watch:
+            pass
+        self.assertFalse(watch.expired)
+        self.assertEqual([], calls)
+
+    def test_expired(self):
+        watchdog = pyoo.Watchdog()
+        event = threading.Event()
+        with watchdog.watch(0.1, event.set) as watch:
+            self.assertTrue(event.wait(5))
+        self.assertTrue(watch.expired)
+
+
+@unittest.skipUnless(which(pyoo.OfficeProcess.binary), 'Office binary is not available.')
+class OperationTimeoutTestCase(unittest.TestCase):
+
+    def test_hung_operation_is_killed(self):
+        with pyoo.OfficeProcess(warm_up=False, operation_timeout=1) as process:
+            desktop = process.desktop
+            pid = process.pid
+            # Simulate a hung office program.
+            os.kill(pid, signal.SIGSTOP)
+            for child in pyoo._get_children(pid):
+                os.kill(child, signal.SIGSTOP)
+            self.assertRaises(pyoo.OfficeTimeoutError, desktop.create_spreadsheet)
+            self.assertNotEqual(pid, process.pid)
+            process.desktop.create_spreadsheet().close()
+
+    def test_concurrent_hung_operations(self):
+        with pyoo.OfficeProcess(warm_up=False, operation_timeout=1) as process:
+            desktop = process.desktop
+            pid = process.pid
+            os.kill(pid, signal.SIGSTOP)
+            for child in pyoo._get_children(pid):
+                os.kill(child, signal.SIGSTOP)
+            errors = []
+
+            def create():
+                try:
+                    desktop.create_spreadsheet()
+                except Exception as e:
+                    errors.append(e)
+
+            threads = [threading.Thread(target=create) for i in range(3)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(3, len(errors))
+            self.assertTrue(all(isinstance(e, pyoo.OfficeTimeoutError) for e in errors))
+            self.assertNotEqual(pid, process.pid)
+            process.desktop.create_spreadsheet().close()
+
+    def test_timeout_error_is_io_error(self):
+        self.assertTrue(issubclass(pyoo.OfficeTimeoutError, IOError))
+
+
+class ProcessStats(object):
+
+    def __init__(self, document_count=0, age=0, memory=None):
+        self.document_count = document_count
+        self.age = age
+        self.memory = memory
+
+
+class RecyclePolicyTestCase(unittest.TestCase):
+
+    def test_no_limits(self):
+        policy = pyoo.RecyclePolicy()
+        self.assertFalse(policy(ProcessStats(1000, 1000, 1000)))
+
+    def test_max_documents(self):
+        policy = pyoo.RecyclePolicy(max_documents=10)
+        self.assertFalse(policy(ProcessStats(document_count=9)))
+        self.assertTrue(policy(ProcessStats(document_count=10)))
+
+    def test_max_age(self):
+        policy = pyoo.RecyclePolicy(max_age=60)
+        self.assertFalse(policy(ProcessStats(age=59)))
+        self.assertTrue(policy(ProcessStats(age=60)))
+
+    def test_max_memory(self):
+        policy = pyoo.RecyclePolicy(max_memory=1024)
+        self.assertFalse(policy(ProcessStats(memory=None)))
+        self.assertFalse(policy(ProcessStats(memory=1023)))
+        self.assertTrue(policy(ProcessStats(memory=1024)))
+
+
+@unittest.skipUnless(which(pyoo.OfficeProcess.binary), 'Office binary is not available.')
+class ProcessPoolTestCase(unittest.TestCase):
+
+    def test_recycle_after_documents(self):
+        process = pyoo.OfficeProcess(warm_up=False)
+        pool = pyoo.DesktopPool.from_processes([process],
+                                               recycle=pyoo.RecyclePolicy(max_documents=2))
+        try:
+            with pool.desktop() as pooled:
+                pid = process.pid
+                pooled.create_spreadsheet().close()
+                pooled.create_spreadsheet().close()
+            self.assertNotEqual(pid, process.pid)
+            with pool.desktop() as pooled:
+                self.assertIs(pooled, process.desktop)
+                self.assertEqual(0, pooled.document_count)
+        finally:
+            process.stop()
+
+    def test_concurrent_connect(self):
+        process = pyoo.OfficeProcess(warm_up=False)
+        pool = pyoo.DesktopPool.from_processes([process])
+        desktops = []
+
+        def job():
+            with pool.desktop() as pooled:
+                desktops.append(pooled)
+
+        threads = [threading.Thread(target=job) for i in range(4)]
+        try:
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(4, len(desktops))
+            self.assertTrue(all(pooled is process.desktop for pooled in desktops))
+        finally:
+            process.stop()
+
+    def test_memory(self):
+        with pyoo.OfficeProcess(warm_up=False) as process:
+            self.assertTrue(process.memory > 0)
+
+    def test_memory_is_cached(self):
+        with pyoo.OfficeProcess(warm_up=False) as process:
+            memory = process.memory
+            get_memory = pyoo._get_memory
+            pyoo._get_memory = lambda pids: 0
+            try:
+                self.assertEqual(memory, process.memory)
+                process.memory_interval = 0
+                self.assertEqual(0, process.memory)
+            finally:
+                pyoo._get_memory = get_memory
+
+
+class ConvertManyTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def create_document(self, name):
+        path = os.path.join(self.directory, name)
+        doc = desktop.create_spreadsheet()
+        try:
+            doc.sheets[0][0, 0].value = name
+            doc.save(path)
+        finally:
+            doc.close()
+        return path
+
+    def test_convert(self):
+        inputs = [self.create_document('doc%d.ods' % i) for i in range(4)]
+        pool = pyoo.DesktopPool.from_ports([2002, 2002])
+        results = list(pyoo.convert_many(inputs, pyoo.FILTER_EXCEL_2007, pool=pool))
+        self.assertEqual(4, len(results))
+        self.assertTrue(all(result.ok for result in results))
+        self.assertEqual(sorted(inputs), sorted(result.input for result in results))
+        for result in results:
+            self.assertEqual(os.path.splitext(result.input)[0] + '.xlsx', result.output)
+            self.assertTrue(os.path.exists(result.output))
+
+    def test_output_paths(self):
+        path = self.create_document('doc.ods')
+        output = os.path.join(self.directory, 'output.xls')
+        pool = pyoo.DesktopPool.from_ports([2002])
+        result, = pyoo.convert_many([(path, output)], pyoo.FILTER_EXCEL_97, pool=pool)
+        self.assertTrue(result.ok)
+        self.assertTrue(os.path.exists(output))
+
+    def test_errors_do_not_stop_batch(self):
+        path = self.create_document('doc.ods')
+        missing = os.path.join(self.directory, 'missing.ods')
+        pool = pyoo.DesktopPool.from_ports([2002])
+        results = list(pyoo.convert_many([missing, path], pyoo.FILTER_PDF_EXPORT, pool=pool))
+        results = dict((result.input, result) for result in results)
+        self.assertIsInstance(results[missing].error, IOError)
+        self.assertTrue(results[path].ok)
+
+    def test_unknown_filter_requires_output(self):
+        path = self.create_document('doc.ods')
+        pool = pyoo.DesktopPool.from_ports([2002])
+        result, = pyoo.convert_many([path], 'calc8', pool=pool)
+        self.assertIsInstance(result.error, ValueError)
+
+
+class DesktopPoolTestCase(unittest.TestCase):
+
+    def test_empty_pool(self):
+        self.assertRaises(ValueError, pyoo.DesktopPool, [])
+
+    def test_unknown_strategy(self):
+        self.assertRaises(ValueError, pyoo.DesktopPool.from_ports, [2002], strategy='x')
+
+    def test_checkout(self):
+        pool = pyoo.DesktopPool.from_ports([2002])
+        desktop = pool.checkout()
+        self.assertIsInstance(desktop, pyoo.Desktop)
+        self.assertTrue(desktop.is_alive())
+        pool.checkin(desktop)
+
+    def test_concurrent_connect(self):
+        calls = []
+
+        def factory():
+            calls.append(None)
+            time.sleep(0.1)
+            return pyoo.Desktop('localhost', 2002)
+
+        pool = pyoo.DesktopPool([factory])
+        threads = [threading.Thread(target=lambda: pool.checkin(pool.checkout()))
+                   for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(1, len(calls))
+
+    def test_connection_is_reused(self):
+        pool = pyoo.DesktopPool.from_ports([2002])
+        with pool.desktop() as first:
+            pass
+        with pool.desktop() as second:
+            pass
+        self.assertIs(first, second)
+
+    def test_round_robin(self):
+        pool = pyoo.DesktopPool.from_ports([2002, 2002])
+        with pool.desktop() as first:
+            pass
+        with pool.desktop() as second:
+            pass
+        with pool.desktop() as third:
+            pass
+        self.assertIsNot(first, second)
+        self.assertIs(first, third)
+
+    def test_least_busy(self):
+        pool = pyoo.DesktopPool.from_ports([2002, 2002], strategy=pyoo.POOL_LEAST_BUSY)
+        with pool.desktop() as first:
+            with pool.desktop() as second:
+                self.assertIsNot(first, second)
+            with pool.desktop() as third:
+                self.assertIs(second, third)
+
+    def test_checkin_unknown_desktop(self):
+        pool = pyoo.DesktopPool.from_ports([2002])
+        self.assertRaises(ValueError, pool.checkin, desktop)
+
+    def test_create_spreadsheet(self):
+        pool = pyoo.DesktopPool.from_ports([2002])
+        with pool.desktop() as pooled:
+            doc = pooled.create_spreadsheet()
+            doc.close()
+
+
 class NameGeneratorTestCase(unittest.TestCase):
 
     def test_empty_name(self):